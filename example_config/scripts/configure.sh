@@ -11,6 +11,8 @@
 # OSI_TIMEZONE           : Timezone to be used
 # OSI_ADDITIONAL_SOFTWARE: Space-separated list of additional packages to install
 # OSI_ADDITIONAL_FEATURES: Space-separated list of additional features chosen
+#
+# Progress can be reported to OSI_PROGRESS_FD like in the install script.
 
 # sanity check that all variables were set
 if [ -z ${OSI_DESKTOP+x} ] || \
@@ -57,11 +59,13 @@ echo ''
 
 # Pretending to do something
 echo 'Pretending to do something'
+echo 'phase Pretending to do something' >&$OSI_PROGRESS_FD
 
 for i in {1..5}
 do
     sleep 1
     echo -n '.'
+    echo "progress $((i * 20))" >&$OSI_PROGRESS_FD
 done
 
 echo
@@ -0,0 +1,22 @@
+#! /bin/sh
+
+# This is an example script step.
+# It gets called once an internet connection is established and the chosen
+# desktop is final, i.e. when the install step starts. It runs alongside the
+# install step and finishes before the configure step starts.
+# Only the requested variables are set:
+# OSI_DESKTOP
+
+echo "Downloading packages for '$OSI_DESKTOP'."
+
+# Pretending to do something
+for i in 1 2 3
+do
+    sleep 1
+    echo -n '.'
+done
+
+echo
+echo 'Download completed.'
+
+exit 0
@@ -9,6 +9,11 @@
 # OSI_DEVICE_EFI_PARTITION: Set if device is partition and system uses EFI boot.
 # OSI_USE_ENCRYPTION      : 1 if the installation is to be encrypted
 # OSI_ENCRYPTION_PIN      : The encryption pin to use (if encryption is set)
+#
+# Progress can be reported by writing lines to the file descriptor in
+# OSI_PROGRESS_FD (available to prepare, install and configure scripts):
+# phase <text>        : Name of the current phase, shown on the install page
+# progress <0-100>    : Progress of the current script in percent
 
 import os
 import sys
@@ -41,13 +46,20 @@ def printEnv():
         print(f'{env:<25} {os.getenv(env)}')
 
 
+def reportProgress(message):
+    if progress_fd := os.getenv('OSI_PROGRESS_FD'):
+        os.write(int(progress_fd), f'{message}\n'.encode())
+
+
 def idleAround():
     # Pretending to do something
     print('Pretending to do something')
+    reportProgress('phase Pretending to do something')
 
     for i in range(20):
         sleep(1)
         print(".", end="", flush=True)
+        reportProgress(f'progress {(i + 1) * 5}')
 
 
 if __name__ == '__main__':
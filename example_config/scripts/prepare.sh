@@ -4,16 +4,23 @@
 # If `internet > connection_required` is enabled in the config, this script gets
 # called once an internet connection is established, otherwise it's called
 # immediately.
+#
+# Progress can be reported by writing lines to the file descriptor in
+# OSI_PROGRESS_FD:
+# phase <text>        : Name of the current phase, shown on the install page
+# progress <0-100>    : Progress of the current script in percent
 
 echo 'Preparation started.'
 
 # Pretending to do something
 echo 'Pretending to do something'
+echo 'phase Pretending to do something' >&$OSI_PROGRESS_FD
 
 for i in {1..5}
 do
     sleep 1
     echo -n '.'
+    echo "progress $((i * 20))" >&$OSI_PROGRESS_FD
 done
 
 echo
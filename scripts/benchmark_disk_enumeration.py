@@ -0,0 +1,234 @@
+#!/bin/python3
+
+'''
+Measures disk enumeration of the installed os-installer against a synthetic
+UDisks object tree with many disks and partitions.
+
+Example: ./benchmark_disk_enumeration.py --disks 64 --partitions 12 --efi-layout alternating
+'''
+
+from argparse import ArgumentParser
+from statistics import median
+import sys
+from time import perf_counter
+import tracemalloc
+from types import SimpleNamespace
+
+
+EFI_PARTITION_GUID = 'C12A7328-F81F-11D2-BA4B-00A0C93EC93B'
+LINUX_PARTITION_GUID = '0FC63DAF-8483-4772-8E79-3D69D8477DE4'
+OBJECT_PATH = '/org/freedesktop/UDisks2'
+GIGABYTE = 1000 * 1000 * 1000
+
+
+class FakeInterface:
+    def __init__(self, **properties):
+        self.props = SimpleNamespace(**properties)
+
+
+class FakeObject:
+    def __init__(self, object_path, block=None, partition=None,
+                 partition_table=None, drive=None):
+        self.object_path = object_path
+        self.block = block
+        self.partition = partition
+        self.partition_table = partition_table
+        self.drive = drive
+
+    def get_object_path(self):
+        return self.object_path
+
+    def get_block(self):
+        return self.block
+
+    def get_drive(self):
+        return self.drive
+
+    def get_partition(self):
+        return self.partition
+
+    def get_partition_table(self):
+        return self.partition_table
+
+
+class FakeObjectManager:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def connect(self, signal, func):
+        pass
+
+    def get_objects(self):
+        return list(self.objects.values())
+
+
+class FakeClient:
+    '''Stand-in for UDisks.Client, only serving from a local object tree.'''
+
+    def __init__(self, objects):
+        self.object_manager = FakeObjectManager(objects)
+
+    def get_object(self, object_path):
+        return self.object_manager.objects.get(object_path, None)
+
+    def get_object_manager(self):
+        return self.object_manager
+
+    def get_size_for_display(self, size, use_pow2, long_string):
+        return f'{size / GIGABYTE:.1f} GB'
+
+
+def _is_efi(layout, disk_number, partition_number):
+    match layout:
+        case 'none':
+            return False
+        case 'first':
+            return partition_number == 1
+        case 'alternating':
+            return disk_number % 2 == 0 and partition_number == 1
+        case 'multiple':
+            return partition_number <= 2
+
+
+def create_objects(num_disks, num_partitions, num_loop_devices, efi_layout):
+    objects = {}
+
+    def add(object_path, **interfaces):
+        objects[object_path] = FakeObject(object_path, **interfaces)
+
+    for disk_number in range(num_disks):
+        name = f'fake{disk_number}'
+        drive_path = f'{OBJECT_PATH}/drives/Fake_Disk_{disk_number}'
+        disk_path = f'{OBJECT_PATH}/block_devices/{name}'
+        partition_size = 8 * GIGABYTE
+
+        add(drive_path, drive=FakeInterface(
+            vendor='Fake', model=f'Disk {disk_number}', optical=False))
+        add(disk_path,
+            block=FakeInterface(
+                device=f'/dev/{name}', size=(num_partitions + 1) * partition_size,
+                id_label='', drive=drive_path),
+            partition_table=FakeInterface(partitions=[
+                f'{disk_path}p{number}' for number in range(1, num_partitions + 1)]))
+
+        for number in range(1, num_partitions + 1):
+            is_efi = _is_efi(efi_layout, disk_number, number)
+            add(f'{disk_path}p{number}',
+                block=FakeInterface(
+                    device=f'/dev/{name}p{number}', size=partition_size,
+                    id_label='EFI' if is_efi else f'Partition {number}', drive=drive_path),
+                partition=FakeInterface(
+                    number=number, table=disk_path,
+                    type=EFI_PARTITION_GUID if is_efi else LINUX_PARTITION_GUID))
+
+    # e.g. snaps, have no drive and never get listed
+    for number in range(num_loop_devices):
+        add(f'{OBJECT_PATH}/block_devices/loop{number}',
+            block=FakeInterface(device=f'/dev/loop{number}', size=GIGABYTE,
+                                id_label='', drive='/'))
+    return objects
+
+
+def measure(func, repeat):
+    timings = []
+    for run in range(repeat):
+        start = perf_counter()
+        result = func()
+        timings.append(perf_counter() - start)
+    return result, timings
+
+
+def report(name, timings):
+    print(f'{name:>20}: min {min(timings) * 1000:9.3f} ms, '
+          f'median {median(timings) * 1000:9.3f} ms')
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--disks', type=int, default=16)
+    parser.add_argument('--partitions', type=int, default=8, help='per disk')
+    parser.add_argument('--loop-devices', type=int, default=0)
+    parser.add_argument('--efi-layout', default='first',
+                        choices=['none', 'first', 'alternating', 'multiple'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--rows', action='store_true',
+                        help='also build disk page rows, needs a display')
+    parser.add_argument('--module-dir', default='/usr/share/os-installer',
+                        help='directory containing the os_installer module')
+    parser.add_argument('--locale-dir', default='/usr/share/locale')
+    args = parser.parse_args()
+
+    sys.path.insert(1, args.module_dir)
+    from os_installer.translator import initialize_translator
+    initialize_translator(args.locale_dir)
+
+    from os_installer.config import config
+    config.init('/dev/null/no-config', False, False)
+
+    from os_installer.disk_provider import disk_provider
+    objects = create_objects(args.disks, args.partitions,
+                             args.loop_devices, args.efi_layout)
+    disk_provider.udisks_client = FakeClient(objects)
+    disk_provider.use_dummy_implementation = False
+    disk_provider.preloaded = True
+    disk_provider.preload_started = True
+
+    print(f'{args.disks} disks with {args.partitions} partitions each '
+          f'({args.efi_layout} EFI layout), {args.loop_devices} loop devices, '
+          f'{len(objects)} objects in total')
+
+    # enumeration
+    tracemalloc.start()
+    measure(disk_provider.get_disks, 1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    disks, timings = measure(disk_provider.get_disks, args.repeat)
+    report('enumeration', timings)
+    print(f'{"peak memory":>20}: {peak / 1024:9.1f} KiB for {len(disks)} disks')
+
+    # existence checks
+    def index():
+        for udisks_object in objects.values():
+            disk_provider._index_object(udisks_object)
+    timings = measure(index, args.repeat)[1]
+    report('device index', timings)
+
+    devices = disks + [partition for disk in disks
+                       for partition in disk.partitions or []]
+
+    def check_existence():
+        return all(disk_provider.disk_exists(device) for device in devices)
+    exists, timings = measure(check_existence, args.repeat)
+    report('disk_exists (each)', [timing / len(devices) for timing in timings])
+    if not exists:
+        print('Error: listed device not found by disk_exists')
+
+    if not args.rows:
+        return
+
+    # row creation
+    import gi
+    gi.require_version('Adw', '1')
+    gi.require_version('Gtk', '4.0')
+    from gi.repository import Adw, Gio
+    Gio.Resource.load(f'{args.module_dir}/os-installer.gresource')._register()
+    Adw.init()
+
+    config.set('disk', {**config.get('disk'), 'partition_ok': True})
+    from os_installer.device_info import Disk
+    from os_installer.disk import DiskPage
+    page = DiskPage()
+
+    def build_rows():
+        return [page._create_device_row(Disk(disk)) for disk in disks]
+    tracemalloc.start()
+    measure(build_rows, 1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = measure(build_rows, args.repeat)[1]
+    report('rows built', timings)
+    print(f'{"peak memory":>20}: {peak / 1024:9.1f} KiB for {len(disks)} rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,25 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from copy import deepcopy
 from enum import Enum
+from hashlib import sha256
 from pathlib import Path
-from threading import Lock
+from threading import Lock, RLock
 import traceback
+from weakref import WeakMethod
 import yaml
 
+from gi.repository import GLib
+
+from .cache import file_stamp, load_cache, store_cache
+from .installation_step import InstallationStep
+
+# libyaml based loader is a lot faster, if available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 class RunMode(Enum):
     default = 0
@@ -17,6 +31,7 @@ default_config = {
     # general
     'distribution_name': 'Untitled',
     'scripts': {'prepare': None, 'install': None, 'configure': None},
+    'script_steps': [],
     # internet
     'internet': {
         'connection_required': True,
@@ -42,6 +57,8 @@ default_config = {
     'additional_features': [],
     # install
     'install_slideshow': [],
+    'installation_report': None,
+    'script_resources': {'scope': False, 'cpu_weight': 20, 'io_weight': 20},
     # fail
     'failure_help_url': 'https://duckduckgo.com/?q="os-installer {}"+"failed installation"',
     # commands
@@ -76,10 +93,16 @@ internal_values = {
     'feature_choices': {},
     'software_choices': {},
     # other
+    'available_disks': None,
+    'installation_phase': '',
+    'installation_progress': None,
     'installation_running': False,
     'logged-error': None,
     'min_disk_size_str': '',
+    'retry_possible': False,
     'send_notification': None,
+    'step_reports': (),
+    'script_pressure': None,
     'terminal-placeholder': None,
     'display-toast': None,
     'version': -1,
@@ -99,65 +122,140 @@ fallback_values = {
 }
 
 
-def _match(variables, var, *ok_types):
-    if not var in variables:
-        print(f'Config error: {var} does not exist.')
-        return False
-    elif type(variables[var]) not in ok_types:
-        print(f'Config error: {var} not of expected type (expected ',
-              f'{ok_types}, but got {type(variables[var])})')
-        return False
-    else:
-        return True
+# allowed types of config values that differ from the type of the default
+schema_overrides = {
+    ('scripts', 'prepare'): (str, type(None)),
+    ('scripts', 'install'): (str, type(None)),
+    ('scripts', 'configure'): (str, type(None)),
+    ('fixed_language',): (bool, str),
+    ('welcome_page', 'logo'): (str, type(None)),
+    ('welcome_page', 'text'): (str, type(None)),
+    ('installation_report',): (str, type(None)),
+    ('disk', 'min_size'): (int, float),
+    ('script_resources', 'cpu_weight'): (int, float),
+    ('script_resources', 'io_weight'): (int, float),
+}
+
+
+def _compile_schema(defaults, parent_path=()):
+    '''Flattens the defaults into (key path, allowed types) checks, parents first.'''
+    checks = []
+    for key, default in defaults.items():
+        path = parent_path + (key,)
+        checks.append((path, schema_overrides.get(path, (type(default),))))
+        if type(default) is dict:
+            checks += _compile_schema(default, path)
+    return tuple(checks)
+
+
+config_schema = _compile_schema(default_config)
 
 
 def _validate_scripts(variables):
-    scripts = variables.get('scripts', None)
-    if (not _match(variables, 'scripts', dict) or
-            (scripts['install'] is None and scripts['configure'] is None)):
+    scripts = variables['scripts']
+    if scripts['install'] is None and scripts['configure'] is None:
         print('Config error: Either install or configure script must exist. '
               'This setup will not be able to install anything.')
         return False
     return True
 
 
+def _validate_script_step_requirements(step):
+    # envvar_creator depends on config, so only importing it once needed
+    from .envvar_creator import get_requirement_step
+
+    ready_at = InstallationStep.prepare
+    for requirement in step['requires']:
+        if (type(requirement) is not str or
+                (requirement_step := get_requirement_step(requirement)) is None):
+            print(f'Config error: script_steps -> {step["name"]} -> requires has '
+                  f'unknown requirement "{requirement}".')
+            return False
+        ready_at = max(ready_at, requirement_step, key=lambda step: step.value)
+
+    if ready_at.value >= InstallationStep[step['before']].value:
+        print(f'Config error: script_steps -> {step["name"]} can not run before '
+              f'{step["before"]}, as it requires values that are only final then.')
+        return False
+    return True
+
+
+def _validate_script_steps(variables):
+    valid = True
+    for index, step in enumerate(variables['script_steps']):
+        if (type(step) is not dict or type(step.get('name', None)) is not str or
+                type(step.get('script', None)) is not str):
+            print(f'Config error: script_steps -> {index} needs a name and a script.')
+            valid = False
+        elif type(step.setdefault('requires', [])) is not list:
+            print(f'Config error: script_steps -> {step["name"]} -> requires is not a list.')
+            valid = False
+        elif not step.setdefault('before', 'done') in ['prepare', 'install', 'configure', 'done']:
+            print(f'Config error: script_steps -> {step["name"]} -> before must be one of '
+                  'prepare, install, configure or done.')
+            valid = False
+        elif not _validate_script_step_requirements(step):
+            valid = False
+    return valid
+
+
 def _validate(variables):
     assert not variables['fixed_language'] == True, 'Need to specify or disable fixed language.'
 
-    return (
-        _match(variables, 'welcome_page', dict) and
-        _match(variables['welcome_page'], 'usage', bool) and
-        _match(variables['welcome_page'], 'logo', str, type(None)) and
-        _match(variables['welcome_page'], 'text', str, type(None)) and
-        _match(variables, 'internet', dict) and
-        _match(variables['internet'], 'connection_required', bool) and
-        _match(variables['internet'], 'checker_url', str) and
-        _match(variables, 'disk', dict) and
-        _match(variables['disk'], 'min_size', int, float) and
-        _match(variables['disk'], 'partition_ok', bool) and
-        _match(variables, 'disk_encryption', dict) and
-        _match(variables['disk_encryption'], 'offered', bool) and
-        _match(variables['disk_encryption'], 'forced', bool) and
-        _match(variables['disk_encryption'], 'generated', bool) and
-        _match(variables['disk_encryption'], 'min_length', int) and
-        _match(variables['disk_encryption'], 'confirmation', bool) and
-        _match(variables, 'user', dict) and
-        _match(variables['user'], 'min_password_length', int) and
-        _match(variables['user'], 'request_username', bool) and
-        _match(variables['user'], 'provide_autologin', bool) and
-        _match(variables['user'], 'password_confirmation', bool) and
-        _match(variables, 'additional_software', list) and
-        _match(variables, 'additional_features', list) and
-        _match(variables, 'install_slideshow', list) and
-        _match(variables, 'distribution_name', str) and
-        _match(variables, 'fixed_language', bool, str))
+    errors = []
+    values = {(): variables}
+    for path, ok_types in config_schema:
+        parent_path = path[:-1]
+        # parent missing or not a dict, already reported
+        if not parent_path in values:
+            continue
+
+        name = ' -> '.join(path)
+        if not path[-1] in (parent := values[parent_path]):
+            errors.append(f'{name} does not exist.')
+        elif type(value := parent[path[-1]]) not in ok_types:
+            errors.append(f'{name} not of expected type (expected '
+                          f'{ok_types}, but got {type(value)})')
+        else:
+            values[path] = value
+
+    for error in errors:
+        print(f'Config error: {error}')
+    return not errors
+
+
+class Subscription:
+    '''
+    Subscribed function. Bound methods are only weakly referenced, so
+    subscriptions of deleted objects vanish on their own.
+    '''
+    __slots__ = ['variable', 'main_thread', 'owner_id', 'func']
+
+    def __init__(self, variable, func, main_thread, on_owner_deleted):
+        self.variable = variable
+        self.main_thread = main_thread
+        self.owner_id = None
+        self.func = lambda: func
+        if (owner := getattr(func, '__self__', None)) is not None:
+            self.owner_id = id(owner)
+            try:
+                self.func = WeakMethod(func, lambda _: on_owner_deleted(self))
+            except TypeError:
+                pass  # not weakly referencable, keep alive
 
 
 class Config:
     def __init__(self):
-        self.variables = default_config
-        self.subscription_lock = Lock()
+        self.variables = deepcopy(default_config)
+        # reentrant, as deleted owners might get cleaned up at any point
+        self.subscription_lock = RLock()
+        # variable -> tuple of subscriptions, replaced on change (copy-on-write)
         self.subscriptions = {}
+        # id of owner -> list of its subscriptions
+        self.owner_subscriptions = {}
+        # latest values not yet delivered to main thread subscriptions
+        self.delivery_lock = Lock()
+        self.pending_deliveries = {}
         self.initialized = False
         self.run_mode = RunMode.default
 
@@ -166,8 +264,28 @@ class Config:
         if self.run_mode == RunMode.test:
             traceback.print_stack()
 
-    def _load_from_file(self, file):
-        config_from_file = yaml.load(file, Loader=yaml.Loader)
+    def _load(self, config_path, version):
+        '''
+        Loads merged, validated and preprocessed config values, from cache if
+        the config file is unchanged. Returns whether the config is valid.
+        '''
+        content = Path(config_path).read_bytes()
+        cache_key = (file_stamp(config_path), sha256(content).hexdigest(), version)
+        if cached_variables := load_cache('config', cache_key):
+            self.variables = cached_variables
+            return True
+
+        self._load_from_file(content)
+        if (not _validate(self.variables) or not _validate_scripts(self.variables) or
+                not _validate_script_steps(self.variables)):
+            return False
+
+        self._preprocess_values()
+        store_cache('config', cache_key, self.variables)
+        return True
+
+    def _load_from_file(self, content):
+        config_from_file = yaml.load(content, Loader=SafeLoader)
         for config_property in config_from_file:
             if config_property in legacy_values:
                 self._handle_legacy(
@@ -215,13 +333,45 @@ class Config:
         GIGABYTE_FACTOR = 1000 * 1000 * 1000
         self.variables['disk']['min_size'] *= GIGABYTE_FACTOR
 
-    def _update_subscribers(self, variable, new_value):
-        subscribers = []
+    def _remove_subscription(self, subscription):
+        with self.subscription_lock:
+            subscriptions = self.subscriptions.get(subscription.variable, ())
+            self.subscriptions[subscription.variable] = tuple(
+                other for other in subscriptions if other is not subscription)
+
+    def _owner_deleted(self, subscription):
         with self.subscription_lock:
-            if variable in self.subscriptions:
-                subscribers = self.subscriptions[variable]
-        for func in subscribers:
-            func(new_value)
+            self.owner_subscriptions.pop(subscription.owner_id, None)
+            self._remove_subscription(subscription)
+
+    def _deliver_current(self, subscription):
+        if func := subscription.func():
+            func(self.variables[subscription.variable])
+        return False
+
+    def _deliver_pending(self):
+        with self.delivery_lock:
+            pending, self.pending_deliveries = self.pending_deliveries, {}
+        for variable, value in pending.items():
+            for subscription in self.subscriptions.get(variable, ()):
+                if subscription.main_thread and (func := subscription.func()):
+                    func(value)
+        return False
+
+    def _update_subscribers(self, variable, new_value):
+        # tuples are never modified, so no locking needed
+        deliver_later = False
+        for subscription in self.subscriptions.get(variable, ()):
+            if subscription.main_thread:
+                deliver_later = True
+            elif func := subscription.func():
+                func(new_value)
+
+        if deliver_later:
+            with self.delivery_lock:
+                if not self.pending_deliveries:
+                    GLib.idle_add(self._deliver_pending)
+                self.pending_deliveries[variable] = new_value
 
     ### public methods ###
 
@@ -241,7 +391,7 @@ class Config:
     def has(self, variable):
         return variable in self.variables
 
-    def init(self, config_path, demo_mode, test_mode):
+    def init(self, config_path, demo_mode, test_mode, version=None):
         if demo_mode and test_mode:
             print("Only one of demo and test mode can be set at a time! "
                   "Using demo mode.")
@@ -255,9 +405,7 @@ class Config:
 
         use_default_error = None
         try:
-            with open(config_path, 'r') as file:
-                self._load_from_file(file)
-            if not _validate(self.variables) or not _validate_scripts(self.variables):
+            if not self._load(config_path, version):
                 use_default_error = 'Config errors'
             else:
                 self.base_path = Path(config_path).parent.absolute()
@@ -270,15 +418,15 @@ class Config:
 
         if use_default_error:
             print(f'{use_default_error}. Running in demo mode.')
-            self.variables = default_config
+            self.variables = deepcopy(default_config)
 
             # Test default config to assure it doesn't contain errors
             if self.run_mode == RunMode.test and not _validate(default_config):
                 print('Developer error: Default config contains errors!')
             self.run_mode = RunMode.demo
+            self._preprocess_values()
 
         self.variables.update(internal_values)
-        self._preprocess_values()
         self.initialized = True
 
     def is_demo(self):
@@ -289,7 +437,10 @@ class Config:
 
     def set(self, variable, new_value):
         '''Returns whether config was changed.'''
-        if self.variables.get(variable, None) == new_value:
+        old_value = self.variables.get(variable, None)
+        # lists and dicts are compared by identity only, avoiding deep comparisons
+        if old_value is new_value or (
+                not type(new_value) in [list, dict] and old_value == new_value):
             return False
 
         if not self.initialized and not variable in fallback_values:
@@ -310,25 +461,38 @@ class Config:
         if variable in self.variables:
             return self.variables.pop(variable)
 
-    def subscribe(self, variable, func, delayed=False):
+    def subscribe(self, variable, func, delayed=False, main_thread=False):
+        '''
+        Calls func with the variable's value on every change and, unless
+        delayed, right away. With main_thread, all values are delivered from
+        the main loop instead, once per iteration with the latest value.
+        '''
+        subscription = Subscription(variable, func, main_thread, self._owner_deleted)
         with self.subscription_lock:
-            if variable in self.subscriptions:
-                self.subscriptions[variable].append(func)
-            else:
-                self.subscriptions[variable] = [func]
+            self.subscriptions[variable] = self.subscriptions.get(variable, ()) + (subscription,)
+            if subscription.owner_id:
+                self.owner_subscriptions.setdefault(
+                    subscription.owner_id, []).append(subscription)
         if delayed:
             return
         if variable in self.variables:
-            func(self.variables[variable])
+            if main_thread:
+                GLib.idle_add(self._deliver_current, subscription)
+            else:
+                func(self.variables[variable])
         elif not variable in fallback_values:
             self._internal_error(f'Subscribing to unknown variable "{variable}"')
 
+    def get_subscribed_variables(self, obj):
+        '''Variables the given object subscribed to with its methods.'''
+        with self.subscription_lock:
+            return {subscription.variable for subscription
+                    in self.owner_subscriptions.get(id(obj), [])}
+
     def unsubscribe(self, obj):
         with self.subscription_lock:
-            for subs in self.subscriptions.values():
-                for func in subs:
-                    if hasattr(func, '__self__') and func.__self__ == obj:
-                        subs.remove(func)
+            for subscription in self.owner_subscriptions.pop(id(obj), []):
+                self._remove_subscription(subscription)
 
 
 config = Config()
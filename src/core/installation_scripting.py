@@ -1,15 +1,82 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from threading import Lock
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock, Thread
+from time import monotonic
+from typing import NamedTuple
+import json
 import os
 
 from gi.repository import Gio, GLib, Vte
 
+from .cgroup import can_create_scope, get_cgroup_path, read_pressure, scope_command
 from .config import config
-from .envvar_creator import create_envs
+from .disk_provider import disk_provider
+from .envvar_creator import create_envs, get_env_values, get_requirement_step
 from .installation_step import InstallationStep
 from .terminal_provider import terminal_provider
 
+# file descriptor in scripts for reporting progress, see OSI_PROGRESS_FD
+PROGRESS_FD = 3
+# seconds between updates of the pressure of a running step's scope
+PRESSURE_INTERVAL = 2
+
+
+class ScriptStep(NamedTuple):
+    '''Additional script, run as soon as the variables it requires are final.'''
+    name: str
+    script: str
+    requires: list
+    ready_at: InstallationStep  # step at which all required variables are final
+    before: InstallationStep    # step that waits for this one to finish
+
+
+class StepReport(NamedTuple):
+    '''Resource usage of an installation step's script and its children.'''
+    step: str
+    exit_code: int
+    wall_time: float  # seconds
+    cpu_time: float   # seconds, user and system
+    max_rss: int      # bytes, of the largest process
+    read_bytes: int   # from block devices
+    written_bytes: int
+
+
+class Checkpoint(NamedTuple):
+    '''Successfully finished installation step, from which a retry can continue.'''
+    step: InstallationStep
+    config_hash: str  # of the values the step's script was run with
+
+
+def _hash_env_values(step):
+    values = json.dumps(get_env_values(step), sort_keys=True, default=str)
+    return sha256(values.encode()).hexdigest()
+
+
+def _create_step_report(step, status, rusage, start_time):
+    # block operations are counted in units of 512 bytes, max rss in KiB
+    return StepReport(step.name, os.waitstatus_to_exitcode(status),
+                      monotonic() - start_time, rusage.ru_utime + rusage.ru_stime,
+                      rusage.ru_maxrss * 1024,
+                      rusage.ru_inblock * 512, rusage.ru_oublock * 512)
+
+
+def _create_failed_step_report(step, start_time):
+    '''Report for a step whose process could not be started or awaited.'''
+    return StepReport(step.name, -1, monotonic() - start_time, 0.0, 0, 0, 0)
+
+
+def _get_ready_step(requires):
+    '''Step at which all requirements are met. Requirements are validated with the config.'''
+    steps = [get_requirement_step(requirement) for requirement in requires]
+    return max([InstallationStep.prepare, *steps], key=lambda step: step.value)
+
+
+def _parse_script_step(step):
+    return ScriptStep(step['name'], step['script'], step['requires'],
+                      _get_ready_step(step['requires']), InstallationStep[step['before']])
+
 
 class InstallationScripting():
     '''
@@ -17,6 +84,9 @@ class InstallationScripting():
     * Preparation. Used e.g. for updating mirrors.
     * Installation. Installs an OS onto a disk.
     * Configuration. Configures an OS according to user's choices.
+
+    Additional script steps run alongside, each started as soon as the
+    variables it requires are final and awaited before a given step.
     '''
 
     def __init__(self):
@@ -26,18 +96,185 @@ class InstallationScripting():
         self.ready_step = InstallationStep.none
         self.running_step = InstallationStep.none
         self.finished_step = InstallationStep.none
+        self.failed = False
+        self.checkpoints = []
+
+        # parsed once config is available
+        self.script_steps = None
+        self.started_script_steps = set()
+        self.finished_script_steps = set()
+        self.failed_script_steps = set()
+        self.offline_script_steps = set()
+
+        # progress reported by scripts
+        self.progress_buffer = b''
+        self.current_phase = None
+        self.phase_timings = []
+        self.step_reports = []
+        self.step_start_time = 0
+
+        # transient scope of the running step, if used
+        self.scope_unit = None
+        self.running_pid = None
+
+        config.subscribe('internet_connection', self._internet_connection_changed,
+                         delayed=True, main_thread=True)
+
+    def _add_checkpoint(self, step):
+        self.checkpoints.append(Checkpoint(step, _hash_env_values(step)))
+
+    def _update_retry_possible(self):
+        possible = self.failed and self.running_step == InstallationStep.none
+        config.set('retry_possible', possible)
+
+    def _await_child(self, pid, step, start_time):
+        # not using a GLib child watch, as it does not provide resource usage
+        try:
+            _, status, rusage = os.wait4(pid, 0)
+        except ChildProcessError as e:
+            print(f'Could not wait for step "{step.name}": {e}')
+            GLib.idle_add(self._on_child_exited, -1,
+                          _create_failed_step_report(step, start_time))
+            return
+        report = _create_step_report(step, status, rusage, start_time)
+        GLib.idle_add(self._on_child_exited, status, report)
+
+    def _create_command(self, step, file_path):
+        command = [f'./{file_path}']
+        resources = config.get('script_resources')
+        if not resources['scope']:
+            return command
+        if not can_create_scope():
+            print('Not using a scope for scripts, systemd-run or its service manager is not available')
+            return command
+
+        self.scope_unit = f'os-installer-{os.getpid()}-{step.name}.scope'
+        return scope_command(self.scope_unit, command,
+                             resources['cpu_weight'], resources['io_weight'])
 
     def _fail_installation(self, __):
+        with self.lock:
+            self.failed = True
+            self._update_retry_possible()
+        self._write_report()
         config.set('installation_running', False)
         config.set('displayed-page', 'failed')
         # Translators: Notification text
         config.set('send_notification', _("Installation Failed"))
 
+    def _end_phase(self):
+        if not self.current_phase:
+            return
+        step, phase, start_time = self.current_phase
+        duration = monotonic() - start_time
+        self.phase_timings.append((step, phase, duration))
+        config.set('logged-error', f'Phase "{phase}" took {duration:.1f}s')
+        self.current_phase = None
+
+    def _handle_progress_message(self, line, step):
+        match line.split(maxsplit=1):
+            case ['progress', value]:
+                try:
+                    progress = min(max(float(value), 0), 100) / 100
+                except ValueError:
+                    print(f'Ignoring invalid progress "{value}"')
+                    return
+                config.set('installation_progress', progress)
+            case ['phase', phase]:
+                self._end_phase()
+                self.current_phase = (step.name, phase, monotonic())
+                config.set('installation_phase', phase)
+            case _:
+                print(f'Ignoring unknown progress message "{line}"')
+
+    def _open_progress_channel(self, step):
+        '''Returns the write end of a pipe, from which progress messages are read.'''
+        read_fd, write_fd = os.pipe()
+        self.progress_buffer = b''
+        config.set('installation_phase', '')
+        config.set('installation_progress', None)
+        GLib.io_add_watch(read_fd, GLib.PRIORITY_DEFAULT,
+                          GLib.IOCondition.IN | GLib.IOCondition.HUP,
+                          self._on_progress, step)
+        return write_fd
+
+    def _write_report(self):
+        if not (report_path := config.get('installation_report')):
+            return
+
+        steps = []
+        for report in self.step_reports:
+            phases = [{'name': phase, 'duration': duration}
+                      for step, phase, duration in self.phase_timings
+                      if step == report.step]
+            steps.append({**report._asdict(), 'phases': phases})
+
+        try:
+            path = Path(report_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as file:
+                json.dump({'version': config.get('version'), 'steps': steps}, file, indent=2)
+        except OSError as e:
+            config.set('logged-error', f'Could not write installation report: {e}')
+
+    def _read_script_step_output(self, stream, script_step):
+        stream.read_bytes_async(4096, GLib.PRIORITY_DEFAULT, self.cancel,
+                                self._on_script_step_output, script_step)
+
+    def _script_steps_pending(self, step: InstallationStep):
+        return any(script_step.before == step and
+                   not script_step.name in self.finished_script_steps
+                   for script_step in self.script_steps)
+
+    def _start_ready_script_steps(self):
+        if self.script_steps is None:
+            configured = config.get('script_steps')
+            self.script_steps = [_parse_script_step(step) for step in configured]
+
+        for script_step in self.script_steps:
+            if (script_step.name in self.started_script_steps or
+                    script_step.ready_at.value > self.ready_step.value):
+                continue
+            if 'internet' in script_step.requires and not config.get('internet_connection'):
+                if not script_step.name in self.offline_script_steps:
+                    self.offline_script_steps.add(script_step.name)
+                    config.set('logged-error', f'Script step "{script_step.name}" '
+                               'waits for an internet connection')
+                continue
+            self._start_script_step(script_step)
+
+    def _start_script_step(self, script_step):
+        self.started_script_steps.add(script_step.name)
+
+        launcher = Gio.SubprocessLauncher.new(
+            Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_MERGE)
+        launcher.set_cwd('/')
+        envs = get_env_values(script_step.ready_at, script_step.requires)
+        for name, value in envs.items():
+            launcher.setenv(name, str(value), True)
+
+        file_path = config.base_path / script_step.script
+        try:
+            process = launcher.spawnv([f'./{file_path}'])
+        except GLib.Error as e:
+            self.failed_script_steps.add(script_step.name)
+            config.set('logged-error', f'Could not start script step "{script_step.name}": {e.message}')
+            GLib.idle_add(self._fail_installation, None)
+            return
+
+        print(f'Starting script step "{script_step.name}"...')
+        self._read_script_step_output(process.get_stdout_pipe(), script_step)
+        process.wait_check_async(self.cancel, self._on_script_step_exited, script_step)
+
     def _try_start_next_script(self):
-        if self.running_step != InstallationStep.none:
+        if self.running_step != InstallationStep.none or self.failed:
             return
 
         if self.finished_step is InstallationStep.configure:
+            if self._script_steps_pending(InstallationStep.done):
+                return
+            self.finished_step = InstallationStep.done
+            self._write_report()
             config.set('installation_running', False)
             # Translators: Notification text
             config.set('send_notification', _("Finished Installation"))
@@ -47,16 +284,28 @@ class InstallationScripting():
             return
 
         next_step = InstallationStep(self.finished_step.value + 1)
+        if self._script_steps_pending(next_step):
+            return
         if next_step != InstallationStep.prepare:
             config.set('installation_running', True)
 
+        if next_step == InstallationStep.install:
+            disk = config.get('chosen_device')
+            if not disk or not disk_provider.disk_exists(disk):
+                config.set('logged-error', 'Chosen disk is no longer available')
+                config.set('logged-error', 'Stopping installation')
+                GLib.idle_add(self._fail_installation, None)
+                return
+
         envs = create_envs(next_step)
+        envs.insert(-1, f'OSI_PROGRESS_FD={PROGRESS_FD}')
 
         # start script
         file_name = config.get('scripts')[next_step.name]
         if not file_name:
             print(f'Skipping step "{next_step.name}"')
             self.finished_step = next_step
+            self._add_checkpoint(next_step)
             self._try_start_next_script()
             return
 
@@ -64,14 +313,19 @@ class InstallationScripting():
         if file_path.exists():
             print(f'Starting step "{next_step.name}"...')
             pty = Vte.Pty.new_sync(Vte.PtyFlags.NO_CTTY, self.cancel)
-            pty.spawn_async(
-                '/', [f'./{file_path}'], envs,
+            progress_fd = self._open_progress_channel(next_step)
+            # passed file descriptors get duplicated, so closing ours right away
+            pty.spawn_with_fds_async(
+                '/', self._create_command(next_step, file_path), envs,
+                [progress_fd], [PROGRESS_FD],
                 GLib.SpawnFlags.DEFAULT,
                 None, None, -1, self.cancel,
                 self._on_child_spawned,
                 (None,))
+            os.close(progress_fd)
             terminal_provider.set_pty(pty)
             self.running_step = next_step
+            self.step_start_time = monotonic()
         else:
             config.set('logged-error', f'Could not find configured script "{file_path}"')
             config.set('logged-error', 'Stopping installation')
@@ -82,33 +336,144 @@ class InstallationScripting():
     def _on_child_spawned(self, pty, task, data):
         success, pid = pty.spawn_finish(task)
         if success:
-            GLib.child_watch_add(pid, self._on_child_exited, None)
+            self.running_pid = pid
+            if self.scope_unit:
+                GLib.timeout_add_seconds(PRESSURE_INTERVAL, self._on_pressure_timeout, pid)
+            Thread(target=self._await_child, daemon=True,
+                   args=(pid, self.running_step, self.step_start_time)).start()
         else:
             config.set('logged-error', f'Error starting {self.running_step}')
-            GLib.idle_add(self._fail_installation, None)
+            self._on_child_exited(-1, _create_failed_step_report(
+                self.running_step, self.step_start_time))
 
-    def _on_child_exited(self, pid, status, data):
+    def _on_child_exited(self, status, report):
         with self.lock:
             self.finished_step = self.running_step
             self.running_step = InstallationStep.none
+            self._update_retry_possible()
+            self.step_reports.append(report)
+            self.running_pid = None
+            self.scope_unit = None
+            config.set('script_pressure', None)
+            config.set('step_reports', tuple(self.step_reports))
 
             if not status == 0:
                 config.set('logged-error', f'Failure during step "{self.finished_step.name}"')
                 GLib.idle_add(self._fail_installation, None)
                 return
 
-            config.set('logged-error', f'Finished step "{self.finished_step.name}".')
+            config.set('logged-error', f'Finished step "{self.finished_step.name}" '
+                       f'in {report.wall_time:.1f}s.')
+            self._add_checkpoint(self.finished_step)
 
             self._try_start_next_script()
 
+    def _internet_connection_changed(self, connected):
+        with self.lock:
+            if connected and self.ready_step != InstallationStep.none:
+                self._start_ready_script_steps()
+
+    def _on_pressure_timeout(self, pid):
+        if pid != self.running_pid:
+            return False
+        config.set('script_pressure', self.get_pressure())
+        return True
+
+    def _on_progress(self, read_fd, condition, step):
+        data = os.read(read_fd, 4096) if condition & GLib.IOCondition.IN else b''
+        if not data:
+            # all writers closed
+            self._end_phase()
+            config.set('installation_phase', '')
+            os.close(read_fd)
+            return False
+
+        *lines, self.progress_buffer = (self.progress_buffer + data).split(b'\n')
+        for line in lines:
+            if line := line.decode(errors='replace').strip():
+                self._handle_progress_message(line, step)
+        return True
+
+    def _on_script_step_exited(self, process, result, script_step):
+        with self.lock:
+            try:
+                process.wait_check_finish(result)
+            except GLib.Error as e:
+                self.failed_script_steps.add(script_step.name)
+                config.set('logged-error', f'Failure during script step "{script_step.name}": {e.message}')
+                GLib.idle_add(self._fail_installation, None)
+                return
+
+            config.set('logged-error', f'Finished script step "{script_step.name}".')
+            self.finished_script_steps.add(script_step.name)
+            self._try_start_next_script()
+
+    def _on_script_step_output(self, stream, result, script_step):
+        try:
+            output = stream.read_bytes_finish(result)
+        except GLib.Error as e:
+            print(f'Could not read output of script step "{script_step.name}": {e.message}')
+            return
+
+        # empty at end of output
+        if output.get_size() > 0:
+            terminal_provider.feed(output.get_data())
+            self._read_script_step_output(stream, script_step)
+
     def _set_ok_to_start_step(self, step: InstallationStep):
         with self.lock:
             if self.ready_step.value < step.value:
                 self.ready_step = step
+                self._start_ready_script_steps()
                 self._try_start_next_script()
 
     ### public methods ###
 
+    def get_pressure(self):
+        '''
+        Pressure stall information of the running step's scope, as returned by
+        read_pressure. None if no step is running in its own scope.
+        '''
+        if not self.scope_unit or not self.running_pid:
+            return None
+        cgroup_path = get_cgroup_path(self.running_pid)
+        # systemd-run might not have moved the process into the scope yet
+        if not cgroup_path or cgroup_path.name != self.scope_unit:
+            return None
+        return read_pressure(cgroup_path)
+
+    def retry(self):
+        '''
+        Continues a failed installation after the last checkpoint whose values are
+        unchanged, rerunning the failed step and failed script steps.
+        Returns whether a retry was started.
+        '''
+        with self.lock:
+            if not self.failed or self.running_step != InstallationStep.none:
+                return False
+
+            valid_checkpoints = []
+            for checkpoint in self.checkpoints:
+                if checkpoint.config_hash != _hash_env_values(checkpoint.step):
+                    config.set('logged-error', f'Values of step "{checkpoint.step.name}" '
+                               'changed, running it again')
+                    break
+                valid_checkpoints.append(checkpoint)
+            self.checkpoints = valid_checkpoints
+            self.finished_step = (valid_checkpoints[-1].step if valid_checkpoints
+                                  else InstallationStep.none)
+
+            self.started_script_steps -= self.failed_script_steps
+            self.failed_script_steps.clear()
+            self.failed = False
+            self._update_retry_possible()
+            config.set('installation_phase', '')
+            config.set('logged-error', f'Retrying after step "{self.finished_step.name}"')
+
+            self._start_ready_script_steps()
+            self._try_start_next_script()
+            return True
+
     def can_run_configure(self):
         self._set_ok_to_start_step(InstallationStep.configure)
 
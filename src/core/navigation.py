@@ -2,13 +2,27 @@
 
 from threading import Lock
 
-from gi.repository import Adw, Gio, Gtk
+from gi.repository import Adw, Gio, GLib, Gtk
 
 from .config import config
-from .page_wrapper import PageWrapper
+from .page_wrapper import PageWrapper, prefetchable_pages, preload_page_type
+from .preload_manager import preload_manager
 from .state_machine import state_machine
 
 
+class PrefetchWatch:
+    '''Reports changes of the values a prefetched page subscribed to.'''
+
+    def __init__(self, page, callback):
+        self.callback = callback
+        variables = config.get_subscribed_variables(page) | config.get_subscribed_variables(page.page)
+        for variable in variables:
+            config.subscribe(variable, self._value_changed, delayed=True, main_thread=True)
+
+    def _value_changed(self, _):
+        self.callback(self)
+
+
 class Navigation(Adw.Bin):
     __gtype_name__ = __qualname__
 
@@ -20,8 +34,13 @@ class Navigation(Adw.Bin):
         self.navigation_view.set_pop_on_escape(False)
         self.set_child(self.navigation_view)
 
+        # next page, constructed ahead of time but not yet added
+        self.prefetched_page = None
+        self.prefetch_watch = None
+
         self.available_pages = state_machine.get_available_pages()
         self._initialize_first_page()
+        self._schedule_prefetch()
         self.navigation_view.connect('get-next-page', self._add_next_page)
         self.navigation_view.connect('popped', self._popped_page)
         self.navigation_view.connect('pushed', self._pushed_page)
@@ -44,6 +63,8 @@ class Navigation(Adw.Bin):
     def _popped_page(self, _, popped_page):
         if not popped_page.permanent:
             del popped_page
+        # values the prefetched page was built with might get changed
+        self._discard_prefetched_page()
         self._update_page()
 
     def _pushed_page(self, _):
@@ -53,6 +74,57 @@ class Navigation(Adw.Bin):
         initial_page = PageWrapper(self.available_pages[0])
         self.navigation_view.add(initial_page)
 
+    def _stop_prefetch_watch(self):
+        if self.prefetch_watch:
+            config.unsubscribe(self.prefetch_watch)
+            self.prefetch_watch = None
+
+    def _discard_prefetched_page(self):
+        self._stop_prefetch_watch()
+        if page := self.prefetched_page:
+            self.prefetched_page = None
+            config.unsubscribe(page.page)
+            config.unsubscribe(page)
+
+    def _prefetch_next_page(self):
+        with self.navigation_lock:
+            current_page = self.navigation_view.get_visible_page()
+            next_page_name = self._get_next_page_name()
+            if (not current_page.permanent or not next_page_name or
+                    self.prefetched_page or
+                    self.navigation_view.find_page(next_page_name)):
+                return False
+
+            # pages get retranslated after leaving the language page, and
+            # constructing a page must not wait for its values to be preloaded
+            if (current_page.get_tag() == 'language' or
+                    not next_page_name in prefetchable_pages or
+                    not preload_manager.is_page_preloaded(next_page_name)):
+                preload_page_type(next_page_name)
+            else:
+                self.prefetched_page = PageWrapper(next_page_name)
+                self.prefetch_watch = PrefetchWatch(
+                    self.prefetched_page, self._prefetched_value_changed)
+        return False
+
+    def _schedule_prefetch(self):
+        if not self.navigation_view.get_visible_page().permanent:
+            return
+        next_page_name = self._get_next_page_name()
+        if (next_page_name and not self.prefetched_page and
+                not self.navigation_view.find_page(next_page_name)):
+            GLib.idle_add(self._prefetch_next_page,
+                          priority=GLib.PRIORITY_LOW)
+
+    def _take_prefetched_page(self, page_name):
+        page = self.prefetched_page
+        if page and page.get_tag() == page_name:
+            self._stop_prefetch_watch()
+            self.prefetched_page = None
+            return page
+        self._discard_prefetched_page()
+        return None
+
     def _remove_all_pages(self, exception=None):
         for page_name in self.available_pages:
             if page_name == exception:
@@ -104,15 +176,15 @@ class Navigation(Adw.Bin):
                 elif stack_page is current_page:
                     self.navigation_view.push_by_tag(page_name)
                     break
+        elif permanent:
+            page_to_load = (self._take_prefetched_page(page_name) or
+                            PageWrapper(page_name))
+            self.navigation_view.add(page_to_load)
+            if self.navigation_view.get_visible_page_tag() != page_name:
+                self.navigation_view.push_by_tag(page_name)
         else:
             page_to_load = PageWrapper(page_name, permanent)
-
-            if permanent:
-                self.navigation_view.add(page_to_load)
-                if self.navigation_view.get_visible_page_tag() != page_name:
-                    self.navigation_view.push_by_tag(page_name)
-            else:
-                self.navigation_view.push(page_to_load)
+            self.navigation_view.push(page_to_load)
 
         self._update_page()
 
@@ -120,6 +192,7 @@ class Navigation(Adw.Bin):
         current_page = self.navigation_view.get_visible_page()
         is_first, is_last = self._current_is_first(), self._current_is_last()
         current_page.update_navigation_buttons(is_first, is_last)
+        self._schedule_prefetch()
 
     def _current_is_first(self):
         return len(self.navigation_view.get_navigation_stack()) == 1
@@ -136,6 +209,13 @@ class Navigation(Adw.Bin):
 
     ### callbacks ###
 
+    def _prefetched_value_changed(self, watch):
+        with self.navigation_lock:
+            # page might have been taken or discarded in the meantime
+            if watch is self.prefetch_watch:
+                self._discard_prefetched_page()
+                self._schedule_prefetch()
+
     def _change_page(self, value):
         with self.navigation_lock:
             match value := config.steal('displayed-page'):
@@ -1,7 +1,5 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from threading import Thread
-
 from .choices_provider import choices_provider
 from .desktop_provider import desktop_provider
 from .disk_provider import disk_provider
@@ -9,6 +7,7 @@ from .format_provider import format_provider
 from .internet_provider import internet_provider
 from .language_provider import language_provider
 from .slideshow_provider import slideshow_provider
+from .state_machine import page_order
 from .terminal_provider import terminal_provider
 from .timezone_provider import timezone_provider
 from .welcome_provider import welcome_provider
@@ -18,21 +17,49 @@ providers = [language_provider, terminal_provider, welcome_provider, internet_pr
              slideshow_provider]
 
 
+def _priority(provider):
+    # ordered by when values are first needed
+    if provider.page in page_order:
+        return page_order.index(provider.page)
+    return provider.lowest_priority
+
+
 class PreloadManager:
-    def __init__(self):
-        self.thread = Thread(target=self._preload)
+    '''
+    Starts preloading of all providers. Their work is run by the preload
+    scheduler with a limited number of workers, prioritized by the page first
+    needing their values. Config dependent providers subscribe right away and
+    queue their work once the value they depend on is set, speculative
+    preloading is queued right away at the same priority.
+    '''
 
-    def _preload(self):
+    def __init__(self):
         for provider in providers:
-            provider.preload()
+            provider.priority = _priority(provider)
 
-        for provider in providers:
-            provider.assert_preloaded()
+    def _on_preload_done(self, provider, future):
+        if exception := future.exception():
+            print(f'Preloading for {provider.__class__.__name__} failed: {exception}')
 
     ### public methods ###
 
+    def is_page_preloaded(self, page_name):
+        '''Whether all values first needed by the given page are available.'''
+        return all(provider.is_preload_done() for provider in providers
+                   if provider.page == page_name)
+
     def start(self):
-        self.thread.start()
+        for provider in providers:
+            if provider.config_var:
+                provider.preload()
+
+        for provider in providers:
+            if provider.config_var:
+                provider.speculate()
+            else:
+                provider.preload()
+                provider.future.add_done_callback(
+                    lambda future, provider=provider: self._on_preload_done(provider, future))
 
 
 preload_manager = PreloadManager()
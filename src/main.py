@@ -18,6 +18,7 @@ from gi.repository import Adw, Gio, GLib, Gtk
 from .config import config
 from .preload_manager import preload_manager
 from .system_calls import SystemCaller
+from .tracing import tracer
 from .window import OsInstallerWindow
 
 APP_ID = 'com.github.p3732.os_installer'
@@ -42,6 +43,12 @@ class Application(Adw.Application):
                              GLib.OptionArg.NONE, "Run in demo mode. Does not alter the system", None)
         self.add_main_option('test-mode', b't', GLib.OptionFlags.NONE,
                              GLib.OptionArg.NONE, "Run in testing mode. Does not alter system settings, but runs scripts.", None)
+        self.add_main_option('trace', b'T', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.STRING, "Record startup timings and write them as Chrome trace to given file", None)
+
+    def _trace_first_frame(self):
+        frame_clock = self.window.get_frame_clock()
+        self.first_frame_handler = frame_clock.connect('after-paint', self._first_frame)
 
     def _setup_icons(self):
         icon_theme = Gtk.IconTheme.get_for_display(self.window.get_display())
@@ -60,14 +67,21 @@ class Application(Adw.Application):
             self.system_caller = SystemCaller(self.window)
             self._setup_icons()
             self.window.present()
+            if tracer.enabled:
+                self._trace_first_frame()
 
     def do_command_line(self, command_line):
         options = command_line.get_options_dict()
         options = options.end().unpack()
 
+        if trace_path := options.get('trace', None):
+            tracer.enable(trace_path)
+            tracer.mark('command line handled')
+
         config.init(options.get('config', DEFAULT_CONFIG_PATH),
                     options.get('demo-mode', False),
-                    options.get('test-mode', False))
+                    options.get('test-mode', False),
+                    self.version)
         config.set('version', self.version)
         config.subscribe('send_notification', self._send_notification)
 
@@ -81,7 +95,12 @@ class Application(Adw.Application):
 
     ### callbacks ###
 
+    def _first_frame(self, frame_clock):
+        tracer.mark('first frame presented')
+        frame_clock.disconnect(self.first_frame_handler)
+
     def _on_quit(self, action, param=None):
+        tracer.dump()
         self.window.close()
         return True
 
@@ -92,7 +92,7 @@ def handle_choices(config_entries):
 
 class ChoicesProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._get_choices)
+        super().__init__(self._get_choices, page='software')
 
     def _get_choices(self):
         feature_choices = handle_choices(config.get('additional_features'))
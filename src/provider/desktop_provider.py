@@ -17,7 +17,7 @@ class Desktop(NamedTuple):
 
 class DesktopProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._get_desktops)
+        super().__init__(self._get_desktops, page='desktop')
 
     def _get_desktops(self):
         self.desktops: list = []
@@ -1,21 +1,59 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from collections import defaultdict
 from random import getrandbits
+from typing import NamedTuple
 
-from gi.repository import GLib, GObject
+from gi.repository import Gio, GLib, GObject
 
 from .config import config
-from .device_info import DeviceInfo, Disk
+from .device_info import Disk, PartitionRecord, create_disk_record
 from .preloadable import Preloadable
 
 
+class _BlockProperties(NamedTuple):
+    device: str
+    size: int
+    label: str
+    drive: str  # object path
+    is_partition: bool
+    has_partition_table: bool
+
+
+class _PartitionProperties(NamedTuple):
+    number: int
+    object_path: str
+    is_efi: bool
+
+
+class _DriveProperties(NamedTuple):
+    name: str
+    optical: bool
+
+
+class _Snapshot(NamedTuple):
+    blocks: dict      # object path -> _BlockProperties
+    partitions: dict  # partition table object path -> [_PartitionProperties]
+    drives: dict      # object path -> _DriveProperties
+
+
 class DiskProvider(Preloadable):
 
     EFI_PARTITION_GUID = 'C12A7328-F81F-11D2-BA4B-00A0C93EC93B'
     EFI_PARTITON_FLAGS = None
 
     def __init__(self):
-        super().__init__(self._init_client)
+        super().__init__(self._init_client, page='disk')
+
+        # live list of disks, only modified on the main thread
+        self.disk_model = Gio.ListStore()
+        self.disk_keys = []
+        self.pending_updates = set()
+        # device path to UDisks object path of all block devices and reverse
+        self.device_paths = {}
+        self.object_devices = {}
+        # memoized human readable sizes
+        self.size_texts = {}
 
     def _init_client(self):
         min_disk_size = config.get('disk')['min_size']
@@ -34,131 +72,257 @@ class DiskProvider(Preloadable):
         self.EFI_PARTITON_FLAGS = UDisks.PartitionTypeInfoFlags.SYSTEM.numerator
         self.udisks_client = UDisks.Client.new_sync()
 
+        # client was created without thread default context, so signals
+        # get emitted on the main thread
+        object_manager = self.udisks_client.get_object_manager()
+        for udisks_object in object_manager.get_objects():
+            self._index_object(udisks_object)
+        object_manager.connect('object-added', self._object_added)
+        object_manager.connect('object-removed', self._object_removed)
+        object_manager.connect(
+            'interface-proxy-properties-changed', self._object_properties_changed)
+
         config.set('min_disk_size_str', self._disk_size_to_str(min_disk_size))
 
     def _disk_size_to_str(self, size):
-        return self.udisks_client.get_size_for_display(size, False, False)
+        if not (size_text := self.size_texts.get(size, None)):
+            size_text = self.udisks_client.get_size_for_display(size, False, False)
+            self.size_texts[size] = size_text
+        return size_text
 
     def _get_partition_info(self, partition, block):
-        partition_label = block.props.id_label.strip()
-        if not partition_label:
+        if not block.label:
             # Translators: Fallback name for partitions that don't have a name
             name = _("Unnamed Partition")
         else:
             # Translators: Squiggly brackets are replaced with partition name
             partition_str = _("{} (Partition)")
-            name = partition_str.format(partition_label)
+            name = partition_str.format(block.label)
 
-        return DeviceInfo(
+        return PartitionRecord(
             name=name,
-            size=block.props.size,
-            size_text=self._disk_size_to_str(block.props.size),
-            device_path=block.props.device,
-            is_efi=partition.props.type.upper() == self.EFI_PARTITION_GUID)
-
-    def _get_partitions(self, partition_table):
-        if not partition_table:
-            return None
+            size=block.size,
+            size_text=self._disk_size_to_str(block.size),
+            device_path=block.device,
+            is_efi=partition.is_efi)
 
+    def _get_partitions(self, snapshot, table_path):
         partitions = []
-        for partition_name in partition_table.props.partitions:
-            partition_object = self.udisks_client.get_object(partition_name)
-            if not partition_object:
-                continue
-            block = partition_object.get_block()
-            partition = partition_object.get_partition()
-            if block and partition:
+        for partition in sorted(snapshot.partitions.get(table_path, [])):
+            if block := snapshot.blocks.get(partition.object_path, None):
                 partitions.append(self._get_partition_info(partition, block))
             else:
                 print('Unhandled partiton in partition table, ignoring.')
 
         return partitions
 
-    def _get_disk_info(self, block, drive, partition_table):
-        if not (name := (f'{drive.props.vendor} {drive.props.model}'.strip())):
+    def _get_disk_info(self, snapshot, object_path, block, drive):
+        if not (name := drive.name):
             # Translators: Fallback name for partitions that don't have a name
             name = _("Unnamed Disk")
-        return Disk(
+        partitions = None
+        if block.has_partition_table:
+            partitions = self._get_partitions(snapshot, object_path)
+        return create_disk_record(
             name=name,
-            size=block.props.size,
-            size_text=self._disk_size_to_str(block.props.size),
-            device_path=block.props.device,
-            partitions=self._get_partitions(partition_table))
+            size=block.size,
+            size_text=self._disk_size_to_str(block.size),
+            device_path=block.device,
+            partitions=partitions)
 
     def _get_dummy_disks(self):
         return [
-            Disk("Dummy", 10000, "10 KB", "/dev/null",
-                 [DeviceInfo("Too small partiton", 1000, "1 KB", "/dev/00null")]),
-            Disk("Totally real device", 100000000000, "100 GB", "/dev/sda", [
-                DeviceInfo("EFI", 200000000, "2 GB", "/dev/sda_efi", True),
-                DeviceInfo("Previous Installation", 20000000000, "40 GB",
-                           "/dev/sda_yes"),
-                DeviceInfo(_("Unnamed Partition"), 20000000000, "30 GB", "/dev/sda_unnamed"),
-                DeviceInfo(_("Unnamed Partition"), 20000000000, "20 GB", "/dev/sda_unnamed2"),
-                DeviceInfo("Swap", 20000000000, "8 GB", '/dev/sda_swap'),
+            create_disk_record("Dummy", 10000, "10 KB", "/dev/null",
+                               [PartitionRecord("Too small partiton", 1000, "1 KB", "/dev/00null")]),
+            create_disk_record("Totally real device", 100000000000, "100 GB", "/dev/sda", [
+                PartitionRecord("EFI", 200000000, "2 GB", "/dev/sda_efi", True),
+                PartitionRecord("Previous Installation", 20000000000, "40 GB",
+                                "/dev/sda_yes"),
+                PartitionRecord(_("Unnamed Partition"), 20000000000, "30 GB", "/dev/sda_unnamed"),
+                PartitionRecord(_("Unnamed Partition"), 20000000000, "20 GB", "/dev/sda_unnamed2"),
+                PartitionRecord("Swap", 20000000000, "8 GB", '/dev/sda_swap'),
             ]),
-            Disk("VERY BIG DISK", 1000000000000000, "1000 TB",
-                 "/dev/sdb_very_big", []),
+            create_disk_record("VERY BIG DISK", 1000000000000000, "1000 TB",
+                               "/dev/sdb_very_big", []),
         ]
 
-    ### public methods ###
+    def _get_disk(self, snapshot, object_path):
+        block = snapshot.blocks.get(object_path, None)
+        # skip partitions
+        if not block or block.is_partition:
+            return None
 
-    def disk_exists(self, dev_info: DeviceInfo):
-        self.assert_preloaded()
+        drive = snapshot.drives.get(block.drive, None)
+        if drive and not drive.optical:
+            return self._get_disk_info(snapshot, object_path, block, drive)
+        return None
 
+    def _enumerate_disks(self):
+        '''Yields tuples of disk identifier and disk.'''
         if self.use_dummy_implementation:
-            return True
-
-        # check against all available devices
-        dummy_var = GLib.Variant('a{sv}', None)
-        manager = self.udisks_client.get_manager()
-        devices = manager.call_get_block_devices_sync(dummy_var, None)
-        for device in devices:
-            if ((udisks_object := self.udisks_client.get_object(device)) and
-                (block := udisks_object.get_block()) and
-                    block.props.device == dev_info.device_path):
-                return True
+            for disk in self._get_dummy_disks():
+                yield disk.device_path, disk
+            return
 
-        return False
+        if config.is_test() and getrandbits(3) == 7:
+            print("test-mode: randomly chose that no disks are available")
+            return
 
-    def get_disks(self):
+        snapshot = self._take_snapshot()
+        for object_path in sorted(snapshot.blocks):
+            if disk := self._get_disk(snapshot, object_path):
+                yield object_path, disk
+
+    def _get_affected_disk_keys(self, udisks_object):
+        if partition := udisks_object.get_partition():
+            return [partition.props.table]
+        elif udisks_object.get_block():
+            return [udisks_object.get_object_path()]
+        elif udisks_object.get_drive():
+            # drive properties are shown in the rows of its disks
+            drive_path = udisks_object.get_object_path()
+            return [key for key in self.disk_keys
+                    if (disk_object := self.udisks_client.get_object(key)) and
+                    (block := disk_object.get_block()) and
+                    block.props.drive == drive_path]
+        return []
+
+    def _take_snapshot(self):
+        '''
+        Reads all properties needed for listing disks from the object
+        manager's cache in a single pass, without any D-Bus calls.
+        '''
+        snapshot = _Snapshot(blocks={}, partitions=defaultdict(list), drives={})
+        object_manager = self.udisks_client.get_object_manager()
+        for udisks_object in object_manager.get_objects():
+            object_path = udisks_object.get_object_path()
+            partition = udisks_object.get_partition()
+            if block := udisks_object.get_block():
+                snapshot.blocks[object_path] = _BlockProperties(
+                    device=block.props.device,
+                    size=block.props.size,
+                    label=block.props.id_label.strip(),
+                    drive=block.props.drive,
+                    is_partition=partition is not None,
+                    has_partition_table=udisks_object.get_partition_table() is not None)
+            if partition:
+                snapshot.partitions[partition.props.table].append(_PartitionProperties(
+                    number=partition.props.number,
+                    object_path=object_path,
+                    is_efi=partition.props.type.upper() == self.EFI_PARTITION_GUID))
+            elif drive := udisks_object.get_drive():
+                snapshot.drives[object_path] = _DriveProperties(
+                    name=f'{drive.props.vendor} {drive.props.model}'.strip(),
+                    optical=drive.props.optical)
+        return snapshot
+
+    def _index_object(self, udisks_object):
+        self._unindex_object(udisks_object)
+        if block := udisks_object.get_block():
+            object_path = udisks_object.get_object_path()
+            self.device_paths[block.props.device] = object_path
+            self.object_devices[object_path] = block.props.device
+
+    def _unindex_object(self, udisks_object):
+        object_path = udisks_object.get_object_path()
+        if device_path := self.object_devices.pop(object_path, None):
+            if self.device_paths.get(device_path, None) == object_path:
+                del self.device_paths[device_path]
+
+    def _load_disks(self):
         self.assert_preloaded()
+        found_keys = set()
+        try:
+            for key, disk in self._enumerate_disks():
+                found_keys.add(key)
+                GLib.idle_add(self._set_disk, key, disk)
+        except GLib.Error as e:
+            print(f'Could not enumerate disks: {e}')
+        GLib.idle_add(self._loading_done, found_keys)
+
+    def _remove_disk(self, key):
+        if key in self.disk_keys:
+            position = self.disk_keys.index(key)
+            del self.disk_keys[position]
+            self.disk_model.remove(position)
+            config.set('available_disks', len(self.disk_keys))
+
+    def _schedule_update(self, keys):
+        if not keys:
+            return
+        if not self.pending_updates:
+            GLib.idle_add(self._update_disks)
+        self.pending_updates.update(keys)
 
-        if self.use_dummy_implementation:
-            return self._get_dummy_disks()
+    ### callbacks ###
 
-        if config.is_test() and getrandbits(3) == 7:
-            print("test-mode: randomly chose that no disks are available")
-            return []
+    def _loading_done(self, found_keys):
+        for key in [key for key in self.disk_keys if not key in found_keys]:
+            self._remove_disk(key)
+        config.set('available_disks', len(self.disk_keys))
+        return False
 
-        # get available devices
-        dummy_var = GLib.Variant('a{sv}', None)
-        manager = self.udisks_client.get_manager()
-        devices = manager.call_get_block_devices_sync(dummy_var, None)
+    def _object_added(self, object_manager, udisks_object):
+        self._index_object(udisks_object)
+        self._schedule_update(self._get_affected_disk_keys(udisks_object))
+
+    def _object_properties_changed(self, object_manager, udisks_object,
+                                   interface_proxy, changed, invalidated):
+        self._index_object(udisks_object)
+        self._schedule_update(self._get_affected_disk_keys(udisks_object))
+
+    def _object_removed(self, object_manager, udisks_object):
+        self._unindex_object(udisks_object)
+        self._schedule_update(self._get_affected_disk_keys(udisks_object))
+
+    def _set_disk(self, key, record):
+        if key in self.disk_keys:
+            position = self.disk_keys.index(key)
+            # only replace the changed row
+            if self.disk_model.get_item(position).record != record:
+                self.disk_model.splice(position, 1, [Disk(record)])
+        else:
+            self.disk_keys.append(key)
+            self.disk_model.append(Disk(record))
+            config.set('available_disks', len(self.disk_keys))
+        return False
 
-        # get device information
-        disks = []
-        for device in devices:
-            udisks_object = self.udisks_client.get_object(device)
-            if not udisks_object:
-                continue
+    def _update_disks(self):
+        keys, self.pending_updates = self.pending_updates, set()
+        snapshot = self._take_snapshot()
+        for key in keys:
+            if disk := self._get_disk(snapshot, key):
+                self._set_disk(key, disk)
+            else:
+                self._remove_disk(key)
+        return False
 
-            # skip partitions
-            partition = udisks_object.get_partition()
-            if partition:
-                continue
+    ### public methods ###
+
+    def disk_exists(self, device):
+        self.assert_preloaded()
 
-            block = udisks_object.get_block()
-            if not block:
-                continue
+        if self.use_dummy_implementation:
+            return True
 
-            partition_table = udisks_object.get_partition_table()
-            drive = self.udisks_client.get_drive_for_block(block)
-            if drive and not drive.props.optical:
-                disk_info = self._get_disk_info(block, drive, partition_table)
-                disks.append(disk_info)
+        return device.device_path in self.device_paths
 
-        return disks
+    def get_disks(self):
+        '''Returns plain records of all disks, usable in any thread.'''
+        self.assert_preloaded()
+        return [disk for _, disk in self._enumerate_disks()]
+
+    def get_disk_model(self):
+        '''
+        Returns a list model of all disks. It is kept up to date with
+        devices getting added, removed or changed. The number of disks is
+        available as 'available_disks' once the first enumeration finished.
+        '''
+        return self.disk_model
+
+    def load_disks(self):
+        '''Enumerates all disks in a worker thread, updating the disk model.'''
+        self.thread_pool.submit(self._load_disks)
 
 
 disk_provider = DiskProvider()
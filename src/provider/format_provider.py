@@ -1,12 +1,17 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import locale as Locale
+import os
+from threading import Lock
 
-from gi.repository import GnomeDesktop
+from gi.repository import GLib, GnomeDesktop
 
+from .cache import file_stamp, load_cache, store_cache
 from .config import config
 from .filterable_object import FilterableObject
-from .preloadable import Preloadable
+from .language_provider import get_default_locale
+from .preloadable import Preloadable, Speculation
+from .search_index import SearchIndex
 
 
 locales = {
@@ -48,52 +53,120 @@ locales = {
     'tr_CY.UTF-8', 'ar_KW.UTF-8', 'uz_UZ.UTF-8', 'ku_TR.UTF-8', 'en_CA.UTF-8', 'ar_LB.UTF-8', 'iu_CA.UTF-8',
     'aa_DJ.UTF-8', 'so_SO.UTF-8'}
 
+# number of available translations to speculatively preload formats for
+SPECULATED_TRANSLATIONS = 3
+
+
+def _iso_codes_stamps():
+    # region names are provided by iso-codes, cache gets invalidated with it
+    stamps = []
+    for data_dir in GLib.get_system_data_dirs():
+        for file in ['xml/iso-codes/iso_3166.xml', 'iso-codes/json/iso_3166-1.json']:
+            if stamp := file_stamp(os.path.join(data_dir, file)):
+                stamps.append(stamp)
+    return stamps
+
+
+def _likely_translation_locales():
+    language_codes = []
+    if fixed_language := config.get('fixed_language'):
+        language_codes.append(fixed_language)
+    if system_language := os.environ.get('LANG', None):
+        language_codes.append(system_language.split('.')[0])
+    language_codes += config.get('available_translations')[:SPECULATED_TRANSLATIONS]
+
+    return [get_default_locale(code) for code in language_codes]
+
+
+def _region_name(locale, trans_locale):
+    name = GnomeDesktop.get_country_from_locale(locale, trans_locale)
+    if not name:
+        # Fallback translation from current locale
+        name = GnomeDesktop.get_country_from_locale(locale)
+    if not name:
+        # solely to prevent crashes, e.g. for Esperanto
+        # TODO add to translatation
+        name = 'Undefined'
+    return name
+
+
+def _create_formats(trans_locale):
+    formats = []
+    # separate name set to prevent duplicates in list
+    # see gnome-desktop issue https://gitlab.gnome.org/GNOME/gnome-shell/-/issues/3610
+    names = set()
+
+    # Test once if GnomeDesktop supports translation locale
+    has_translation = GnomeDesktop.get_country_from_locale('en_US.UTF-8', trans_locale)
+
+    for locale in locales:
+        if has_translation:
+            name = GnomeDesktop.get_country_from_locale(locale, trans_locale)
+        else:
+            # use fallback
+            name = GnomeDesktop.get_country_from_locale(locale)
+        if name and not name in names:
+            names.add(name)
+            short_locale = locale.split(".")[0]
+            search_string = f'{name.lower()}🛑{short_locale}'
+            formats.append((name, locale, search_string))
+
+    # return sorted (considers umlauts and such)
+    formats.sort(key=lambda t: Locale.strxfrm(t[0]))
+    return formats
+
 
 class FormatProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._initialize_formats, 'language_chosen')
+        speculation = Speculation(candidates=_likely_translation_locales,
+                                  key=lambda language_info: language_info.locale,
+                                  func=self._get_formats_for)
+        super().__init__(self._initialize_formats, 'language_chosen', speculation,
+                         page='region')
+
+        # (translation locale, messages locale) -> (region name, formats, search index)
+        self.format_cache = {}
+        self.format_cache_lock = Lock()
+
+    def _get_formats_for(self, trans_locale):
+        # names without translation fall back to the current messages locale
+        messages_locale = Locale.setlocale(Locale.LC_MESSAGES)
+        memory_key = (trans_locale, messages_locale)
+        with self.format_cache_lock:
+            if cached := self.format_cache.get(memory_key, None):
+                return cached
+
+        cache_name = f'formats-{trans_locale}'
+        cache_key = None
+        if iso_codes_stamps := _iso_codes_stamps():
+            cache_key = (iso_codes_stamps, Locale.setlocale(Locale.LC_COLLATE), messages_locale)
+        if not (entries := cache_key and load_cache(cache_name, cache_key)):
+            entries = (_region_name(trans_locale, trans_locale),
+                       _create_formats(trans_locale))
+            if cache_key:
+                store_cache(cache_name, cache_key, entries)
+
+        name, format_entries = entries
+        formats = [FilterableObject(*entry) for entry in format_entries]
+        cached = (name, formats, SearchIndex(formats))
+
+        with self.format_cache_lock:
+            return self.format_cache.setdefault(memory_key, cached)
 
     def _initialize_formats(self, language_info):
         trans_locale = language_info.locale
-        name = GnomeDesktop.get_country_from_locale(trans_locale, trans_locale)
-        if not name:
-            # Fallback translation from current locale
-            name = GnomeDesktop.get_country_from_locale(trans_locale)
-        if not name:
-            # solely to prevent crashes, e.g. for Esperanto
-            # TODO add to translatation
-            name = 'Undefined'
+        name, self.formats, self.format_index = self._get_formats_for(trans_locale)
         config.set('formats', (trans_locale, name))
 
-        self.formats = []
-        # separate name set to prevent duplicates in list
-        # see gnome-desktop issue https://gitlab.gnome.org/GNOME/gnome-shell/-/issues/3610
-        names = set()
-
-        # Test once if GnomeDesktop supports translation locale
-        has_translation = GnomeDesktop.get_country_from_locale('en_US.UTF-8', trans_locale)
-
-        for locale in locales:
-            if has_translation:
-                name = GnomeDesktop.get_country_from_locale(locale, trans_locale)
-            else:
-                # use fallback
-                name = GnomeDesktop.get_country_from_locale(locale)
-            if name and not name in names:
-                names.add(name)
-                short_locale = locale.split(".")[0]
-                search_string = f'{name.lower()}🛑{short_locale}'
-                format = FilterableObject(name, locale, search_string)
-                self.formats.append(format)
-
-        # return sorted (considers umlauts and such)
-        self.formats.sort(key=lambda t: Locale.strxfrm(t.name))
-
     ### public methods ###
 
     def get_formats(self):
         self.assert_preloaded()
         return self.formats
 
+    def get_format_index(self):
+        self.assert_preloaded()
+        return self.format_index
+
 
 format_provider = FormatProvider()
@@ -46,6 +46,16 @@ language_to_default_locale = {
 }
 
 
+def get_default_locale(language_code):
+    if locale := language_to_default_locale.get(language_code, None):
+        return locale
+    elif '_' in language_code:
+        # already has territory, use as-is
+        return f'{language_code}.UTF-8'
+    else:
+        return None
+
+
 class LanguageInfo(GObject.Object):
     __gtype_name__ = __qualname__
 
@@ -60,7 +70,7 @@ class LanguageInfo(GObject.Object):
 
 class LanguageProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._get_languages)
+        super().__init__(self._get_languages, page='language')
 
         future = self.thread_pool.submit(self._determine_fixed_language)
         config.set('language_use_fixed', future)
@@ -81,11 +91,7 @@ class LanguageProvider(Preloadable):
             return False
 
     def _create_info(self, language_code):
-        locale = language_to_default_locale.get(language_code, None)
-        if not locale and '_' in language_code:
-            # already has territory, use as-is
-            locale = f'{language_code}.UTF-8'
-        elif not locale:
+        if not (locale := get_default_locale(language_code)):
             print(f"Can't determine locale for {language_code}")
             return None
 
@@ -25,6 +25,11 @@ class TerminalProvider(Preloadable):
         if self.stashed and error:
            self.terminal.feed(str.encode(f'{error}\n\r'))
 
+    def feed(self, output: bytes):
+        '''Shows output of processes not attached to the terminal's pty.'''
+        self.assert_preloaded()
+        self.terminal.feed(output.replace(b'\n', b'\n\r'))
+
     def set_pty(self, pty):
         self.assert_preloaded()
         self.terminal.set_pty(pty)
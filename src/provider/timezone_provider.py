@@ -1,10 +1,33 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from gi.repository import GnomeDesktop, GWeather
+import locale
+import os
 
+from gi.repository import GLib, GnomeDesktop, GWeather
+
+from .cache import file_stamp, load_cache, store_cache
 from .config import config
 from .filterable_object import FilterableObject
 from .preloadable import Preloadable
+from .search_index import SearchIndex
+
+
+def _locations_database():
+    # same lookup as libgweather, environment variable is used for testing
+    if path := os.environ.get('LIBGWEATHER_LOCATIONS_PATH'):
+        return path
+    for data_dir in GLib.get_system_data_dirs():
+        path = os.path.join(data_dir, 'libgweather-4', 'Locations.bin')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _cache_key():
+    # location names are translated, so the index is only valid for the same locale
+    if database_stamp := file_stamp(_locations_database()):
+        return (database_stamp, locale.setlocale(locale.LC_MESSAGES))
+    return None
 
 
 def _printable_timezone(id):
@@ -38,12 +61,22 @@ def _recurse_location(location, timezone_map):
 
 class TimezoneProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._get_timezones)
+        super().__init__(self._get_timezones, page='region')
 
     def _get_timezones(self):
         current_id = GnomeDesktop.WallClock().get_timezone().get_identifier()
         config.set('timezone', _printable_timezone(current_id))
 
+        cache_key = _cache_key()
+        if not (entries := cache_key and load_cache('timezones', cache_key)):
+            entries = self._walk_locations()
+            if cache_key:
+                store_cache('timezones', cache_key, entries)
+
+        self.timezones = [FilterableObject(*entry) for entry in entries]
+        self.timezone_index = SearchIndex(self.timezones)
+
+    def _walk_locations(self):
         timezone_map = dict()
         for timezone in GWeather.Location().get_world().get_timezones():
             timezone_map[timezone.get_identifier()] = set()
@@ -52,15 +85,15 @@ class TimezoneProvider(Preloadable):
             if not child.has_timezone():  # skips UTC and Etc/GMT+12
                 _recurse_location(child, timezone_map)
 
-        self.timezones = []
+        entries = []
         for id, locations in sorted(timezone_map.items()):
             printable_name = _printable_timezone(id)
 
             search_string = f'{printable_name.lower()}🛑'
             search_string += '🛑'.join(list(locations))
 
-            timezone = FilterableObject(printable_name, id, search_string)
-            self.timezones.append(timezone)
+            entries.append((printable_name, id, search_string))
+        return entries
 
     ### public methods ###
 
@@ -68,5 +101,9 @@ class TimezoneProvider(Preloadable):
         self.assert_preloaded()
         return self.timezones
 
+    def get_timezone_index(self):
+        self.assert_preloaded()
+        return self.timezone_index
+
 
 timezone_provider = TimezoneProvider()
@@ -8,7 +8,7 @@ from .preloadable import Preloadable
 
 class WelcomeProvider(Preloadable):
     def __init__(self):
-        super().__init__(self._load_image)
+        super().__init__(self._load_image, page='welcome')
 
     def _load_image(self):
         welcome = config.get('welcome_page')
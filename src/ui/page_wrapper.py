@@ -1,28 +1,12 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from importlib import import_module
 from pathlib import Path
 
 from gi.repository import Adw, Gdk, Gtk
 
 from .config import config
-
-from .choices import FeaturePage, SoftwarePage
-from .confirm import ConfirmPage
-from .desktop import DesktopPage
-from .disk import DiskPage
-from .done import DonePage
-from .encrypt import EncryptPage
-from .failed import FailedPage
-from .filter import FormatPage, TimezonePage
-from .install import InstallPage
-from .internet import InternetPage
-from .keyboard import KeyboardLanguagePage, KeyboardLayoutPage, KeyboardOverviewPage
-from .language import LanguagePage
-from .region import RegionPage
-from .restart import RestartPage
-from .summary import SummaryPage
-from .user import UserPage
-from .welcome import WelcomePage
+from .tracing import tracer
 
 page_name_to_page_title = {
     # Translators: Page title
@@ -96,32 +80,59 @@ special_image_pages = {
     'welcome': 'welcome_page_image',
 }
 
-page_name_to_type = {
-    'confirm':              ConfirmPage,
-    'desktop':              DesktopPage,
-    'disk':                 DiskPage,
-    'done':                 DonePage,
-    'encrypt':              EncryptPage,
-    'failed':               FailedPage,
-    'feature':              FeaturePage,
-    'format':               FormatPage,
-    'install':              InstallPage,
-    'internet':             InternetPage,
-    'keyboard-language':    KeyboardLanguagePage,
-    'keyboard-layout':      KeyboardLayoutPage,
-    'keyboard-overview':    KeyboardOverviewPage,
-    'language':             LanguagePage,
-    'region':               RegionPage,
-    'restart':              RestartPage,
-    'software':             SoftwarePage,
-    'summary':              SummaryPage,
-    'timezone':             TimezonePage,
-    'user':                 UserPage,
-    'welcome':              WelcomePage,
+# Page modules get imported when first needed, which also loads their
+# templates and used providers. Maps page name to module and type name.
+page_name_to_type_name = {
+    'confirm':              ('confirm', 'ConfirmPage'),
+    'desktop':              ('desktop', 'DesktopPage'),
+    'disk':                 ('disk', 'DiskPage'),
+    'done':                 ('done', 'DonePage'),
+    'encrypt':              ('encrypt', 'EncryptPage'),
+    'failed':               ('failed', 'FailedPage'),
+    'feature':              ('choices', 'FeaturePage'),
+    'format':               ('filter', 'FormatPage'),
+    'install':              ('install', 'InstallPage'),
+    'internet':             ('internet', 'InternetPage'),
+    'keyboard-language':    ('keyboard', 'KeyboardLanguagePage'),
+    'keyboard-layout':      ('keyboard', 'KeyboardLayoutPage'),
+    'keyboard-overview':    ('keyboard', 'KeyboardOverviewPage'),
+    'language':             ('language', 'LanguagePage'),
+    'region':               ('region', 'RegionPage'),
+    'restart':              ('restart', 'RestartPage'),
+    'software':             ('choices', 'SoftwarePage'),
+    'summary':              ('summary', 'SummaryPage'),
+    'timezone':             ('filter', 'TimezonePage'),
+    'user':                 ('user', 'UserPage'),
+    'welcome':              ('welcome', 'WelcomePage'),
 }
 
+page_name_to_type = {}
+
 reloadable_pages = ['disk']
 
+# pages without side effects on construction, which can be built ahead of time
+# (others e.g. set config values, rescan disks or expect earlier choices)
+prefetchable_pages = ['done', 'encrypt', 'feature', 'region', 'restart', 'software',
+                      'summary', 'user', 'welcome']
+
+
+def get_page_type(page_name):
+    if page_type := page_name_to_type.get(page_name, None):
+        return page_type
+
+    module_name, type_name = page_name_to_type_name[page_name]
+    with tracer.span(f'{page_name} page import', 'page'):
+        module = import_module(f'.{module_name}', __package__)
+    page_type = getattr(module, type_name)
+    page_name_to_type[page_name] = page_type
+    return page_type
+
+
+def preload_page_type(page_name):
+    '''Imports a page's module ahead of time. Usable as idle callback.'''
+    get_page_type(page_name)
+    return False
+
 
 @Gtk.Template(resource_path='/com/github/p3732/os-installer/ui/widgets/page_wrapper.ui')
 class PageWrapper(Adw.NavigationPage):
@@ -136,8 +147,9 @@ class PageWrapper(Adw.NavigationPage):
     content = Gtk.Template.Child()
 
     def __init__(self, page_name, permanent=True, **kwargs):
-        super().__init__(**kwargs)
-        self._set_new_page(page_name)
+        with tracer.span(f'{page_name} page', 'page'):
+            super().__init__(**kwargs)
+            self._set_new_page(page_name)
         self.permanent = permanent
         self.reload_button.set_visible(page_name in reloadable_pages)
 
@@ -146,11 +158,11 @@ class PageWrapper(Adw.NavigationPage):
         del self.page
 
     def _set_new_page(self, page_name):
-        self.page = page_name_to_type[page_name]()
+        self.page = get_page_type(page_name)()
         self.page_name = page_name
         self.content.add(self.page)
         if image_config_value := special_image_pages.get(self.page_name, None):
-            config.subscribe(image_config_value, self._set_title_image)
+            config.subscribe(image_config_value, self._set_title_image, main_thread=True)
         else:
             self._set_title_image(page_name_to_image[self.page_name])
         page_title = self._get_page_title()
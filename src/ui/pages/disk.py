@@ -2,15 +2,17 @@
 
 import os
 
-from gi.repository import Gio, Gtk
+from gi.repository import Gtk
 
 from .config import config
 from .device_info import DeviceInfo, Disk
 from .device_rows import DeviceChoiceRow, DeviceRow, DeviceTooSmallRow, NoEfiPartitionRow
 from .disk_provider import disk_provider
-from .functions import reset_model
 from .translations import translate_widgets
 
+# checked once per session
+is_booted_with_uefi = os.path.isdir("/sys/firmware/efi/efivars")
+
 
 @Gtk.Template(resource_path='/com/github/p3732/os-installer/ui/pages/disk.ui')
 class DiskPage(Gtk.Stack):
@@ -21,8 +23,6 @@ class DiskPage(Gtk.Stack):
     no_disks_page = Gtk.Template.Child()
     reload_button = Gtk.Template.Child()
 
-    disk_list_model = Gio.ListStore()
-
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
@@ -35,13 +35,10 @@ class DiskPage(Gtk.Stack):
 
         # models
         self.disk_list.bind_model(
-            self.disk_list_model, self._create_device_row)
+            disk_provider.get_disk_model(), self._create_device_row)
 
-        if disks := disk_provider.get_disks():
-            reset_model(self.disk_list_model, disks)
-            self.set_visible_child_name('disks')
-        else:
-            self.set_visible_child_name('no-disks')
+        config.subscribe('available_disks', self._available_disks_changed)
+        disk_provider.load_disks()
 
     def _is_big_enough(self, size):
         return size <= 0 or size >= self.minimum_disk_size
@@ -49,13 +46,18 @@ class DiskPage(Gtk.Stack):
     def _create_device_row(self, device: DeviceInfo):
         if not self._is_big_enough(device.size_number):
             return DeviceTooSmallRow(device)
-        if not self.partition_ok or not device.partitions:
+        if not self.partition_ok or not device.record.partitions:
             return DeviceRow(device)
 
         expander_row = DeviceChoiceRow(device, self._row_activated)
+        # partition rows only get created once they would be shown
+        expander_row.connect('notify::expanded', self._device_row_expanded)
+        return expander_row
+
+    def _add_partition_rows(self, expander_row):
+        device = expander_row.device
 
         can_use_partitions = True
-        is_booted_with_uefi = os.path.isdir("/sys/firmware/efi/efivars")
         if is_booted_with_uefi and device.efi_partition is None:
             expander_row.add_row(NoEfiPartitionRow())
             can_use_partitions = False
@@ -68,10 +70,22 @@ class DiskPage(Gtk.Stack):
                 expander_row.add_row(row)
             else:
                 expander_row.add_row(DeviceTooSmallRow(partition))
-        return expander_row
 
     ### callbacks ###
 
+    def _device_row_expanded(self, expander_row, _):
+        if expander_row.get_expanded():
+            expander_row.disconnect_by_func(self._device_row_expanded)
+            self._add_partition_rows(expander_row)
+
+    def _available_disks_changed(self, number_of_disks):
+        if number_of_disks is None:
+            self.set_visible_child_name('loading')
+        elif number_of_disks == 0:
+            self.set_visible_child_name('no-disks')
+        else:
+            self.set_visible_child_name('disks')
+
     @Gtk.Template.Callback('disk_selected')
     def _disk_selected(self, list_box, row):
         self._row_activated(row)
@@ -4,6 +4,7 @@ from gi.repository import Gtk
 
 from .buttons import TerminalButton
 from .config import config
+from .step_report_row import StepReportRow
 from .translations import translate_widgets
 
 
@@ -13,8 +14,17 @@ class DonePage(Gtk.Box):
 
     now_button = Gtk.Template.Child()
     later_button = Gtk.Template.Child()
+    step_report_list = Gtk.Template.Child()
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
         translate_widgets(self.now_button, self.later_button)
+
+        config.subscribe('step_reports', self._show_step_reports)
+
+    def _show_step_reports(self, reports):
+        self.step_report_list.remove_all()
+        for report in reports:
+            self.step_report_list.append(StepReportRow(report))
+        self.step_report_list.set_visible(len(reports) > 0)
@@ -4,6 +4,8 @@ from gi.repository import Gtk
 
 from .buttons import TerminalButton
 from .config import config
+from .installation_scripting import installation_scripting
+from .step_report_row import StepReportRow
 from .translations import translate_widgets
 
 
@@ -12,13 +14,36 @@ class FailedPage(Gtk.Box):
     __gtype_name__ = __qualname__
 
     failure_page = Gtk.Template.Child()
+    retry_button = Gtk.Template.Child()
     search_button = Gtk.Template.Child()
+    step_report_list = Gtk.Template.Child()
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        translate_widgets(self.failure_page, self.search_button)
+        translate_widgets(self.failure_page, self.retry_button, self.search_button)
 
         description = self.failure_page.get_description()
         formatted = description.format(config.get('distribution_name'))
         self.failure_page.set_description(formatted)
+
+        config.subscribe('step_reports', self._show_step_reports)
+        config.subscribe('retry_possible', self._set_retry_possible)
+
+    def _show_step_reports(self, reports):
+        self.step_report_list.remove_all()
+        for report in reports:
+            self.step_report_list.append(StepReportRow(report))
+        self.step_report_list.set_visible(len(reports) > 0)
+
+    def _set_retry_possible(self, possible):
+        # a step still running after a failure has to finish first
+        self.retry_button.set_sensitive(possible)
+
+    ### callbacks ###
+
+    @Gtk.Template.Callback('retry')
+    def _retry(self, button):
+        if installation_scripting.retry():
+            # leave failed page, returning to the previous page
+            config.set_next_page(self)
@@ -5,6 +5,7 @@ from gi.repository import Gtk
 
 from .config import config
 from .format_provider import format_provider
+from .functions import reset_model
 from .timezone_provider import timezone_provider
 from .translations import translate_widgets
 
@@ -19,8 +20,6 @@ class FilterPage(Gtk.Box):
     __gtype_name__ = __qualname__
 
     search_entry = Gtk.Template.Child()
-    custom_filter = Gtk.Template.Child()
-    filter_list_model = Gtk.Template.Child()
     list_model = Gtk.Template.Child()
 
     stack = Gtk.Template.Child()
@@ -34,34 +33,34 @@ class FilterPage(Gtk.Box):
         self.type = filter_type
         match self.type:
             case FilterType.format:
-                self.filter = self._format_filter
-                self.list_model.splice(0, 0, format_provider.get_formats())
+                self.search_index = format_provider.get_format_index()
             case FilterType.timezone:
-                self.filter = self._timezone_filter
-                self.list_model.splice(0, 0, timezone_provider.get_timezones())
+                self.search_index = timezone_provider.get_timezone_index()
+
+        self.matches = self.search_index.all_items
+        self.list_model.splice(0, 0, self.search_index.items)
 
         self.search_entry.connect("search-changed", self._filter)
 
     def _filter(self, *args):
-        self.search_text = self.search_entry.get_text().lower()
-        self.custom_filter.set_filter_func(self.filter)
+        search_text = self.search_entry.get_text().lower()
+        matches = self.search_index.match(search_text)
+        if matches == self.matches:
+            return
+
+        self.matches = matches
+        reset_model(self.list_model, self.search_index.get_items(matches))
 
-        if self.filter_list_model.get_n_items() > 0:
+        if matches:
             self.stack.set_visible_child_name('list')
         else:
             self.stack.set_visible_child_name('none')
 
-    def _format_filter(self, format):
-        return self.search_text in format.search_string
-
-    def _timezone_filter(self, timezone):
-        return self.search_text in timezone.search_string
-
     ### callbacks ###
 
     @Gtk.Template.Callback('row_activated')
     def _row_activated(self, list_view, pos):
-        item = self.filter_list_model.get_item(pos)
+        item = self.list_model.get_item(pos)
         match self.type:
             case FilterType.format:
                 config.set('formats', (item.id, item.name))
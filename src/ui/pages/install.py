@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from threading import Condition, Lock, Thread
+from time import monotonic
 
 from gi.repository import GLib, Gtk
 
@@ -15,6 +16,9 @@ class InstallPage(Gtk.Box):
 
     stack = Gtk.Template.Child()
     carousel = Gtk.Template.Child()
+    progress_box = Gtk.Template.Child()
+    phase_label = Gtk.Template.Child()
+    progress_bar = Gtk.Template.Child()
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -24,6 +28,12 @@ class InstallPage(Gtk.Box):
         else:
             self.stack.set_visible_child_name('spinner')
 
+        self.phase = ''
+        self.phase_start_time = 0
+        self.phase_timeout = None
+        config.subscribe('installation_phase', self._set_phase)
+        config.subscribe('installation_progress', self._set_progress)
+
     def _setup_slideshow(self):
         slideshow = slideshow_provider.get_slideshow()
 
@@ -76,13 +86,41 @@ class InstallPage(Gtk.Box):
                 GLib.idle_add(self._ui_change_slide, self.current_pos)
 
     def _stop_slideshow(self, value):
-        _, page = value
-        # Relevant page change comes from scripting where page is None
-        if page is None:
-            self.stop_slideshow = True
-            with self.cv:
-                self.cv.notify_all()
-            self.thread.join()
+        match value:
+            # Relevant page change comes from scripting where page is None.
+            # Other changes like showing the failed page are plain page names.
+            case 'next', None:
+                self.stop_slideshow = True
+                with self.cv:
+                    self.cv.notify_all()
+                self.thread.join()
+
+    def _set_phase(self, phase):
+        self.phase = phase
+        self.phase_start_time = monotonic()
+        if phase and not self.phase_timeout:
+            self.phase_timeout = GLib.timeout_add_seconds(1, self._update_phase_label)
+        elif not phase and self.phase_timeout:
+            GLib.source_remove(self.phase_timeout)
+            self.phase_timeout = None
+        self._update_phase_label()
+        self.phase_label.set_visible(bool(phase))
+        self._update_progress_visibility()
+
+    def _update_phase_label(self):
+        minutes, seconds = divmod(int(monotonic() - self.phase_start_time), 60)
+        self.phase_label.set_label(f'{self.phase} ({minutes}:{seconds:02})')
+        return True
+
+    def _set_progress(self, progress):
+        if progress is not None:
+            self.progress_bar.set_fraction(progress)
+        self.progress_bar.set_visible(progress is not None)
+        self._update_progress_visibility()
+
+    def _update_progress_visibility(self):
+        visible = self.phase_label.get_visible() or self.progress_bar.get_visible()
+        self.progress_box.set_visible(visible)
 
     def _ui_change_slide(self, position):
         slide = self.carousel.get_nth_page(position)
@@ -1,8 +1,8 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from threading import Lock
+from threading import Thread
 
-from gi.repository import GLib, Gtk
+from gi.repository import Gtk
 
 from .buttons import ContinueButton
 from .config import config
@@ -25,28 +25,23 @@ class InternetPage(Gtk.Stack):
         translate_widgets(self.no_connection_label, self.settings_button,
                           self.yes_connection_label)
 
-        self.update_lock = Lock()
         self.has_advanced = False
 
-        config.subscribe('internet_connection', self._connection_state_changed)
+        config.subscribe('internet_connection', self._connection_state_changed,
+                         main_thread=True)
 
     ### callbacks ###
 
     def _connection_state_changed(self, connected):
-        with self.update_lock:
-            if connected:
-                GLib.idle_add(self._ui_change_stack, 'connected')
-                config.set('internet_page_image',
-                           'network-wireless-symbolic')
-                start_system_timesync()
-                if not self.has_advanced:
-                    self.has_advanced = True
-                    GLib.idle_add(config.set_next_page, self)
-            else:
-                GLib.idle_add(self._ui_change_stack, 'not-connected')
-                config.set('internet_page_image',
-                           'network-wireless-disabled-symbolic')
-
-    def _ui_change_stack(self, name):
-        self.set_visible_child_name(name)
-        return False
+        if connected:
+            self.set_visible_child_name('connected')
+            config.set('internet_page_image', 'network-wireless-symbolic')
+            # blocks until the commands finished
+            Thread(target=start_system_timesync, daemon=True).start()
+            if not self.has_advanced:
+                self.has_advanced = True
+                config.set_next_page(self)
+        else:
+            self.set_visible_child_name('not-connected')
+            config.set('internet_page_image',
+                       'network-wireless-disabled-symbolic')
@@ -20,8 +20,9 @@ class RegionPage(Gtk.Box):
 
         translate_widgets(self.format_hint_row, self.formats_row, self.timezone_row)
 
-        config.subscribe('formats', self._update_formats)
-        config.subscribe('timezone', self._update_timezone)
+        # set by providers from worker threads
+        config.subscribe('formats', self._update_formats, main_thread=True)
+        config.subscribe('timezone', self._update_timezone, main_thread=True)
 
     ### callbacks ###
 
@@ -0,0 +1,18 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import Adw, GLib, Gtk
+
+
+@Gtk.Template(resource_path='/com/github/p3732/os-installer/ui/row/step_report_row.ui')
+class StepReportRow(Adw.ActionRow):
+    __gtype_name__ = __qualname__
+
+    def __init__(self, report, **kwargs):
+        super().__init__(**kwargs)
+
+        self.set_title(report.step.capitalize())
+        # Translators: Resource usage of an installation step. Brackets are replaced by
+        # durations in seconds and sizes, e.g. "12.3 s, 4.5 s CPU, 300 MB memory, 1.2 GB read, 3.4 GB written".
+        self.set_subtitle(_('{:.1f} s, {:.1f} s CPU, {} memory, {} read, {} written').format(
+            report.wall_time, report.cpu_time, GLib.format_size(report.max_rss),
+            GLib.format_size(report.read_bytes), GLib.format_size(report.written_bytes)))
@@ -76,4 +76,5 @@ class SummaryRow(Adw.ActionRow):
         self.set_title(_(title))
 
         config_var, subtitle_func = update_funcs.get(page_name, ("", None))
-        config.subscribe(config_var, lambda v: self.set_subtitle(subtitle_func(v)))
+        config.subscribe(config_var, lambda v: self.set_subtitle(subtitle_func(v)),
+                         main_thread=True)
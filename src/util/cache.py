@@ -0,0 +1,52 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+''' Persistent caching of precomputed data in the user cache directory. '''
+
+import marshal
+import os
+from pathlib import Path
+
+from gi.repository import GLib
+
+
+def _cache_path(name):
+    return Path(GLib.get_user_cache_dir()) / 'os-installer' / f'{name}.cache'
+
+
+def file_stamp(path):
+    '''
+    Identifies the state of a file by its size and modification time.
+    Returns None if the file can not be accessed.
+    '''
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def load_cache(name, key):
+    '''Returns data cached under the given name if it was stored with the same key.'''
+    try:
+        with open(_cache_path(name), 'rb') as file:
+            cached_key, data = marshal.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        print(f'Ignoring unreadable cache "{name}": {e}')
+        return None
+
+    return data if cached_key == key else None
+
+
+def store_cache(name, key, data):
+    '''Stores data under the given name. Data may only contain basic Python types.'''
+    path = _cache_path(name)
+    temp_path = path.with_name(f'{path.name}.{os.getpid()}')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'wb') as file:
+            marshal.dump((key, data), file)
+        os.replace(temp_path, path)
+    except (OSError, ValueError) as e:
+        print(f'Could not write cache "{name}": {e}')
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+''' Running processes in their own cgroup and reading its pressure stall information. '''
+
+import os
+from pathlib import Path
+from shutil import which
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+PRESSURE_RESOURCES = ['cpu', 'io', 'memory']
+# allowed range of cpu.weight and io.weight
+MIN_WEIGHT = 1
+MAX_WEIGHT = 10000
+
+
+def _clamp_weight(weight):
+    return min(max(int(weight), MIN_WEIGHT), MAX_WEIGHT)
+
+
+def _parse_pressure(content):
+    '''Parses lines like "some avg10=0.00 avg60=0.00 avg300=0.00 total=0".'''
+    pressure = {}
+    for line in content.splitlines():
+        kind, *values = line.split()
+        pressure[kind] = {key: float(value) for key, value in
+                          (value.split('=') for value in values)}
+    return pressure
+
+
+def _uses_user_manager():
+    return os.geteuid() != 0
+
+
+def _has_service_manager():
+    if _uses_user_manager():
+        runtime_dir = os.environ.get('XDG_RUNTIME_DIR', None)
+        return bool(runtime_dir) and Path(runtime_dir, 'systemd/private').exists()
+    # same check as sd_booted()
+    return Path('/run/systemd/system').is_dir()
+
+
+def can_create_scope():
+    '''Whether systemd-run and the service manager it would talk to are available.'''
+    return which('systemd-run') is not None and _has_service_manager()
+
+
+def scope_command(unit_name, command, cpu_weight, io_weight):
+    '''Wraps a command to run in a transient systemd scope with the given weights.'''
+    user_flag = ['--user'] if _uses_user_manager() else []
+    return ['systemd-run', *user_flag, '--scope', '--quiet',
+            f'--unit={unit_name}',
+            '--property', f'CPUWeight={_clamp_weight(cpu_weight)}',
+            '--property', f'IOWeight={_clamp_weight(io_weight)}',
+            '--', *command]
+
+
+def get_cgroup_path(pid):
+    '''Returns the cgroup v2 directory of a process, None if unavailable.'''
+    try:
+        with open(f'/proc/{pid}/cgroup') as file:
+            for line in file:
+                # unified hierarchy has the form "0::/path"
+                if line.startswith('0::'):
+                    return CGROUP_ROOT / line[3:].strip().lstrip('/')
+    except OSError:
+        pass
+    return None
+
+
+def read_pressure(cgroup_path):
+    '''
+    Returns pressure stall information of a cgroup per resource, e.g.
+    {'cpu': {'some': {'avg10': 0.5, ...}, 'full': {...}}, ...}.
+    Resources without pressure information are left out.
+    '''
+    pressure = {}
+    for resource in PRESSURE_RESOURCES:
+        try:
+            content = (cgroup_path / f'{resource}.pressure').read_text()
+        except OSError:
+            continue
+        try:
+            pressure[resource] = _parse_pressure(content)
+        except ValueError:
+            print(f'Could not parse {resource} pressure of {cgroup_path}')
+    return pressure
@@ -1,43 +1,70 @@
-
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from typing import NamedTuple
+
 from gi.repository import GObject
 
 
+class PartitionRecord(NamedTuple):
+    name: str
+    size: int
+    size_text: str
+    device_path: str
+    is_efi: bool = False
+
+
+class DiskRecord(NamedTuple):
+    name: str
+    size: int
+    size_text: str
+    device_path: str
+    partitions: tuple = None  # of PartitionRecords, None without partition table
+    efi_partition: str = ''   # name of first EFI partition
+
+
+def create_disk_record(name, size, size_text, device_path, partitions):
+    '''Plain device data, usable without GObject in any thread.'''
+    efi_partition = ''
+    if partitions is not None:
+        partitions = tuple(partitions)
+        efi_partition = next(
+            (partition.name for partition in partitions if partition.is_efi), '')
+    return DiskRecord(name, size, size_text, device_path, partitions, efi_partition)
+
+
 class DeviceInfo(GObject.Object):
+    '''GObject adapter of a device record, for use in list models and rows.'''
     __gtype_name__ = __qualname__
 
-    def __init__(self, name, size, size_text, device_path, is_efi=False):
-        self._name: str = name
-        self._size_text: str = size_text
-        self._device_path: str = device_path
-        self.size_number: int = size
-        self.is_efi: bool = is_efi
-        self.efi_partition: str = ''
+    def __init__(self, record, efi_partition=''):
+        self.record = record
+        self.size_number: int = record.size
+        self.is_efi: bool = getattr(record, 'is_efi', False)
+        self.efi_partition: str = efi_partition
         super().__init__()
 
     @GObject.Property(type=str)
     def device_path(self):
-        return self._device_path
+        return self.record.device_path
 
     @GObject.Property(type=str)
     def name(self):
-        return self._name
+        return self.record.name
 
     @GObject.Property(type=str)
     def size(self):
-        return self._size_text
+        return self.record.size_text
 
 
 class Disk(DeviceInfo):
-    partitions: list = []
-
-    def __init__(self, name, size, size_text, device_path, partitions):
-        super().__init__(name, size, size_text, device_path)
+    def __init__(self, record: DiskRecord):
+        super().__init__(record, record.efi_partition)
+        self._partitions = None
 
-        if partitions:
-            efis = [partition for partition in partitions if partition.is_efi]
-            self.efi_partition = efis[0].name if len(efis) > 0 else ''
-            for partition in partitions:
-                partition.efi_partition = self.efi_partition
-            self.partitions = partitions
+    @property
+    def partitions(self):
+        '''Adapters of partitions, only created when first needed.'''
+        if self._partitions is None and self.record.partitions:
+            self._partitions = [DeviceInfo(partition, self.efi_partition)
+                                for partition in self.record.partitions]
+        return self._partitions or []
@@ -61,32 +61,49 @@ def _parse_choices(choices_var):
     return ' '.join(keywords)
 
 
+# environment variables passed to scripts, with the step they are final for
+envvars = {
+    'OSI_DESKTOP':              (InstallationStep.install, lambda: _get('desktop_chosen')),
+    'OSI_LOCALE':               (InstallationStep.install, _get_locale),
+    'OSI_KEYBOARD_LAYOUT':      (InstallationStep.install, lambda: _get('keyboard_layout')),
+    'OSI_DEVICE_PATH':          (InstallationStep.install, _get_device_path),
+    'OSI_DEVICE_IS_PARTITION':  (InstallationStep.install, lambda: _get('disk_is_partition')),
+    'OSI_DEVICE_EFI_PARTITION': (InstallationStep.install, lambda: _get('disk_efi_partition')),
+    'OSI_USE_ENCRYPTION':       (InstallationStep.install, lambda: _get('use_encryption')),
+    'OSI_ENCRYPTION_PIN':       (InstallationStep.install, lambda: _get('encryption_pin')),
+    'OSI_USER_NAME':            (InstallationStep.configure, lambda: _get('user_name')),
+    'OSI_USER_USERNAME':        (InstallationStep.configure, _get_username),
+    'OSI_USER_AUTOLOGIN':       (InstallationStep.configure, lambda: _get('user_autologin')),
+    'OSI_USER_PASSWORD':        (InstallationStep.configure, lambda: _get('user_password')),
+    'OSI_FORMATS':              (InstallationStep.configure, lambda: _get('formats')),
+    'OSI_TIMEZONE':             (InstallationStep.configure, lambda: _get('timezone')),
+    'OSI_ADDITIONAL_SOFTWARE':  (InstallationStep.configure, lambda: _parse_choices('software_choices')),
+    'OSI_ADDITIONAL_FEATURES':  (InstallationStep.configure, lambda: _parse_choices('feature_choices')),
+}
+
+
 def create_envs(installation_step: InstallationStep):
-    with_configure_envs = installation_step is InstallationStep.configure
-    with_install_envs = installation_step is InstallationStep.install or with_configure_envs
-
-    envs = []
-    if with_install_envs:
-        envs += [
-            f"OSI_DESKTOP={_get('desktop_chosen')}",
-            f"OSI_LOCALE={_get_locale()}",
-            f"OSI_KEYBOARD_LAYOUT={_get('keyboard_layout')}",
-            f"OSI_DEVICE_PATH={_get_device_path()}",
-            f"OSI_DEVICE_IS_PARTITION={_get('disk_is_partition')}",
-            f"OSI_DEVICE_EFI_PARTITION={_get('disk_efi_partition')}",
-            f"OSI_USE_ENCRYPTION={_get('use_encryption')}",
-            f"OSI_ENCRYPTION_PIN={_get('encryption_pin')}",
-        ]
-
-    if with_configure_envs:
-        envs += [
-            f"OSI_USER_NAME={_get('user_name')}",
-            f"OSI_USER_USERNAME={_get_username()}",
-            f"OSI_USER_AUTOLOGIN={_get('user_autologin')}",
-            f"OSI_USER_PASSWORD={_get('user_password')}",
-            f"OSI_FORMATS={_get('formats')}",
-            f"OSI_TIMEZONE={_get('timezone')}",
-            f"OSI_ADDITIONAL_SOFTWARE={_parse_choices('software_choices')}",
-            f"OSI_ADDITIONAL_FEATURES={_parse_choices('feature_choices')}",
-        ]
+    '''Creates the environment variables final at the given step. Returned list is None-terminated.'''
+    envs = [f'{name}={value}' for name, value in get_env_values(installation_step).items()]
     return envs + [None]
+
+
+def get_env_values(installation_step: InstallationStep, names=None):
+    '''Values of environment variables final at the given step, optionally only the given ones.'''
+    return {name: get_value() for name, (step, get_value) in envvars.items()
+            if step.value <= installation_step.value and (names is None or name in names)}
+
+
+def get_final_step(name):
+    '''Returns the step from which on an environment variable is final, None if unknown.'''
+    if name in envvars:
+        return envvars[name][0]
+    return None
+
+
+def get_requirement_step(requirement):
+    '''Returns the step from which on a script step requirement is met, None if unknown.'''
+    if requirement == 'internet':
+        # earliest step, the connection itself is awaited by installation scripting
+        return InstallationStep.prepare
+    return get_final_step(requirement)
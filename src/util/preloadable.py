@@ -1,22 +1,133 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from heapq import heappop, heappush
+from itertools import count
+import os
 from threading import Lock
+from typing import Callable, NamedTuple
 
 from .config import config
+from .tracing import tracer
+
+
+class Speculation(NamedTuple):
+    '''
+    Speculative preloading for config dependent preloadables.
+    Results are computed for likely values before the config variable is set.
+    '''
+    candidates: Callable  # returns keys of likely values
+    key: Callable         # maps a config value to its key
+    func: Callable        # computes the result for a key, e.g. into a cache
+
+
+def _forward_result(source, target):
+    if exception := source.exception():
+        target.set_exception(exception)
+    else:
+        target.set_result(source.result())
+
+
+class PreloadScheduler:
+    '''
+    Runs preloading work on a thread pool, at most max_parallel at a time.
+    Queued work is started by priority (lowest first, then in order of
+    submission), so values needed later do not hold up earlier ones.
+    Work must not wait for other scheduled work.
+    '''
+
+    def __init__(self, thread_pool, max_parallel):
+        self.thread_pool = thread_pool
+        self.max_parallel = max_parallel
+        self.lock = Lock()
+        self.queue = []
+        self.order = count()
+        self.running = 0
+
+    def _run(self, func, future):
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.running -= 1
+            self._start_queued()
+
+    def _start_queued(self):
+        with self.lock:
+            while self.running < self.max_parallel and self.queue:
+                _, _, func, future = heappop(self.queue)
+                # skip cancelled work
+                if future.set_running_or_notify_cancel():
+                    self.running += 1
+                    self.thread_pool.submit(self._run, func, future)
+
+    ### public methods ###
+
+    def submit(self, priority, func):
+        future = Future()
+        with self.lock:
+            heappush(self.queue, (priority, next(self.order), func, future))
+        self._start_queued()
+        return future
 
 
 class Preloadable:
-    # static thread pool
+    # static thread pool, also used for work not scheduled by priority
     thread_pool = ThreadPoolExecutor()
+    scheduler = PreloadScheduler(thread_pool, os.cpu_count() or 2)
+    # priority of preloadables not needed by any page
+    lowest_priority = 1000
 
-    def __init__(self, preload_func, config_var=None):
+    def __init__(self, preload_func, config_var=None, speculation=None, page=None):
         self.preload_func = preload_func
         self.config_var = config_var
+        self.speculation = speculation
+        # first page using the preloaded values, determines preload priority
+        self.page = page
+        self.priority = self.lowest_priority
+        self.speculations = {}
         self.preload_started = False
         self.preloaded = False
         self.preloading_lock = Lock()
 
+    def _submit(self, func, *args):
+        name = self.__class__.__name__
+        queued = tracer.now()
+
+        def traced_func():
+            tracer.record(f'{name} queued', 'preload', queued)
+            with tracer.span(name, 'preload'):
+                return func(*args)
+        return self.scheduler.submit(self.priority, traced_func)
+
+    def _adopt_speculation(self, speculated, value):
+        '''Preloads the value once its speculation finished, without blocking a worker.'''
+        future = Future()
+
+        def speculation_done(speculated):
+            if exception := speculated.exception():
+                class_name = self.__class__.__name__
+                print(f'Speculative preloading for {class_name} failed: {exception}')
+            # speculated result is picked up from where speculation func stored it
+            preloaded = self._submit(self.preload_func, value)
+            preloaded.add_done_callback(lambda done: _forward_result(done, future))
+
+        speculated.add_done_callback(speculation_done)
+        return future
+
+    def _speculate(self):
+        keys = self.speculation.candidates()
+        with self.preloading_lock:
+            # real value already arrived
+            if self.preload_started:
+                return
+            for key in keys:
+                if key and not key in self.speculations:
+                    self.speculations[key] = self._submit(
+                        self.speculation.func, key)
+
     ### public methods ###
 
     def assert_preloaded(self):
@@ -32,9 +143,14 @@ class Preloadable:
                 self.preloading_lock.acquire()
 
             # await result
-            self.future.result()
+            with tracer.span(f'{self.__class__.__name__} awaited', 'wait'):
+                self.future.result()
             self.preloaded = True
 
+    def is_preload_done(self):
+        with self.preloading_lock:
+            return self.preload_started and self.future.done()
+
     def preload(self):
         with self.preloading_lock:
             if self.config_var:
@@ -44,11 +160,32 @@ class Preloadable:
             else:
                 if self.preload_started:
                     return
-                self.future = self.thread_pool.submit(self.preload_func)
+                self.future = self._submit(self.preload_func)
                 self.preload_started = True
+                return
+
+        # config variable might have been set before subscribing
+        if config.has(self.config_var) and (value := config.get(self.config_var)) is not None:
+            self.dependent_preload(value)
+
+    def speculate(self):
+        '''Preloads results for likely values, unless the real value already arrived.'''
+        if self.speculation:
+            self._speculate()
 
     def dependent_preload(self, value):
         with self.preloading_lock:
             self.preloaded = False
-            self.future = self.thread_pool.submit(self.preload_func, value)
+
+            speculated = None
+            if self.speculations:
+                speculated = self.speculations.pop(self.speculation.key(value), None)
+                for other in self.speculations.values():
+                    other.cancel()
+                self.speculations.clear()
+
+            if speculated:
+                self.future = self._adopt_speculation(speculated, value)
+            else:
+                self.future = self._submit(self.preload_func, value)
             self.preload_started = True
@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import defaultdict
+
+GRAM_LENGTH = 3
+SEPARATOR = '🛑'
+
+
+def _grams(search_string):
+    grams = set()
+    for part in search_string.split(SEPARATOR):
+        for length in range(1, GRAM_LENGTH + 1):
+            for start in range(len(part) - length + 1):
+                grams.add(part[start:start + length])
+    return grams
+
+
+def _positions(bitmap):
+    while bitmap:
+        lowest_bit = bitmap & -bitmap
+        yield lowest_bit.bit_length() - 1
+        bitmap ^= lowest_bit
+
+
+class SearchIndex:
+    '''
+    Inverted index over the search strings of filterable objects, mapping
+    every substring of up to GRAM_LENGTH characters to a bitmap of the
+    items containing it. Longer search texts are narrowed down by combining
+    the bitmaps of their trigrams and only verifying the remaining items.
+
+    Results are kept for all prefixes of the latest search text. Typing
+    further narrows down the previous result, deleting characters restores
+    the previous results without searching.
+    '''
+
+    def __init__(self, items):
+        self.items = items
+        self.all_items = (1 << len(items)) - 1
+        self.prefix_matches = {'': self.all_items}
+
+        grams = defaultdict(int)
+        for position, item in enumerate(items):
+            bit = 1 << position
+            for gram in _grams(item.search_string):
+                grams[gram] |= bit
+        self.grams = dict(grams)
+
+    def _match(self, search_text, candidates):
+        if SEPARATOR in search_text:
+            return 0
+        if len(search_text) <= GRAM_LENGTH:
+            return candidates & self.grams.get(search_text, 0)
+
+        for start in range(len(search_text) - GRAM_LENGTH + 1):
+            gram = search_text[start:start + GRAM_LENGTH]
+            if not (candidates := candidates & self.grams.get(gram, 0)):
+                return 0
+
+        matches = 0
+        for position in _positions(candidates):
+            if search_text in self.items[position].search_string:
+                matches |= 1 << position
+        return matches
+
+    def _longest_prefix_matches(self, search_text):
+        longest_prefix = max((text for text in self.prefix_matches
+                              if search_text.startswith(text)), key=len)
+        return self.prefix_matches[longest_prefix]
+
+    ### public methods ###
+
+    def get_items(self, matches):
+        '''Returns the items of a match bitmap in their original order.'''
+        return [self.items[position] for position in _positions(matches)]
+
+    def match(self, search_text):
+        '''Returns a bitmap of all items whose search string contains the search text.'''
+        if (matches := self.prefix_matches.get(search_text, None)) is None:
+            candidates = self._longest_prefix_matches(search_text)
+            matches = self._match(search_text, candidates)
+
+        self.prefix_matches = {text: prefix_matches for text, prefix_matches
+                               in self.prefix_matches.items()
+                               if search_text.startswith(text)}
+        self.prefix_matches[search_text] = matches
+        return matches
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+''' Optional recording of startup and preloading timings. '''
+
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+from threading import Lock, get_ident
+from time import monotonic_ns
+
+
+class Tracer:
+    '''
+    Records spans with monotonic timestamps. Disabled by default, in which
+    case recording is a no-op. Spans can be exported as Chrome trace event
+    JSON (viewable e.g. in about:tracing or Perfetto) and as a plain summary.
+    '''
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = Lock()
+        self.events = []
+        self.start_time = monotonic_ns()
+        self.trace_path = None
+
+    def _timestamp(self, time_ns):
+        # trace event format uses microseconds
+        return (time_ns - self.start_time) / 1000
+
+    ### public methods ###
+
+    def enable(self, trace_path):
+        self.enabled = True
+        self.start_time = monotonic_ns()
+        self.trace_path = trace_path
+
+    def now(self):
+        return monotonic_ns()
+
+    def mark(self, name, category='app'):
+        '''Records an instant event.'''
+        if not self.enabled:
+            return
+        with self.lock:
+            self.events.append({'name': name, 'cat': category, 'ph': 'i', 's': 'g',
+                                'ts': self._timestamp(monotonic_ns()),
+                                'pid': 0, 'tid': get_ident()})
+
+    def record(self, name, category, start, end=None):
+        '''Records a span between two monotonic timestamps in nanoseconds.'''
+        if not self.enabled:
+            return
+        end = end or monotonic_ns()
+        with self.lock:
+            self.events.append({'name': name, 'cat': category, 'ph': 'X',
+                                'ts': self._timestamp(start),
+                                'dur': (end - start) / 1000,
+                                'pid': 0, 'tid': get_ident()})
+
+    @contextmanager
+    def span(self, name, category='app'):
+        start = monotonic_ns()
+        try:
+            yield
+        finally:
+            self.record(name, category, start)
+
+    def summary(self):
+        totals = defaultdict(float)
+        for event in self.events:
+            if event['ph'] == 'X':
+                totals[(event['cat'], event['name'])] += event['dur']
+
+        lines = []
+        for (category, name), duration in sorted(totals.items()):
+            lines.append(f'{category:>8} {duration / 1000:10.1f} ms  {name}')
+        for event in self.events:
+            if event['ph'] == 'i':
+                lines.append(f'{event["cat"]:>8} at {event["ts"] / 1000:7.1f} ms  {event["name"]}')
+        return '\n'.join(lines)
+
+    def dump(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            print(f'Startup trace:\n{self.summary()}')
+            try:
+                with open(self.trace_path, 'w') as file:
+                    json.dump({'traceEvents': self.events}, file)
+                print(f'Wrote trace to "{self.trace_path}"')
+            except OSError as e:
+                print(f'Could not write trace: {e}')
+
+
+tracer = Tracer()